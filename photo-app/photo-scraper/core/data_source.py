@@ -30,10 +30,26 @@ class DataSource(ABC):
         """获取文章详情"""
         pass
     
+    def fetch_article_detail(self, article_id: int, detail_url: str) -> Any:
+        """
+        只获取文章详情的原始数据，由 parse_article_detail 解析
+        
+        流水线模式下获取和解析在不同的线程中执行；默认直接返回解析好的详情
+        """
+        return self.get_article_detail(article_id, detail_url)
+    
+    def parse_article_detail(self, article_id: int, raw: Any) -> Optional[Dict[str, Any]]:
+        """解析 fetch_article_detail 返回的原始数据"""
+        return raw
+    
     @abstractmethod
     def test_connection(self) -> bool:
         """测试连接"""
         pass
+    
+    def close(self) -> None:
+        """关闭数据源，释放缓存等资源"""
+        pass
 
 
 class DataSourceManager:
@@ -62,6 +78,11 @@ class DataSourceManager:
             raise ValueError("没有活动的数据源")
         return self.sources[self.active_source]
     
+    def close(self) -> None:
+        """关闭所有数据源"""
+        for source in self.sources.values():
+            source.close()
+    
     def list_sources(self) -> List[str]:
         """列出所有数据源"""
         return list(self.sources.keys())
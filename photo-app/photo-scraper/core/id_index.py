@@ -0,0 +1,62 @@
+"""文章 ID 索引 - 在内存中记录已存在的文章 ID"""
+from typing import Iterable
+
+
+class IdBitmap:
+    """整数 ID 位图
+    
+    文章 ID 是连续增长的整数，用位图存储每个 ID 只占 1 bit，
+    10 万篇文章约 12KB。超出 max_dense 的稀疏 ID 存入普通集合。
+    """
+    
+    def __init__(self, ids: Iterable[int] = (), max_dense: int = 1 << 24):
+        self.max_dense = max_dense
+        self._bits = bytearray()
+        self._sparse = set()
+        self._count = 0
+        self.update(ids)
+    
+    def add(self, article_id: int) -> None:
+        """添加 ID"""
+        if article_id < 0 or article_id >= self.max_dense:
+            if article_id not in self._sparse:
+                self._sparse.add(article_id)
+                self._count += 1
+            return
+        
+        byte, bit = divmod(article_id, 8)
+        if byte >= len(self._bits):
+            # 按倍数扩容，避免逐字节增长
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+        mask = 1 << bit
+        if not self._bits[byte] & mask:
+            self._bits[byte] |= mask
+            self._count += 1
+    
+    def discard(self, article_id: int) -> None:
+        """移除 ID"""
+        if article_id < 0 or article_id >= self.max_dense:
+            if article_id in self._sparse:
+                self._sparse.remove(article_id)
+                self._count -= 1
+            return
+        
+        byte, bit = divmod(article_id, 8)
+        mask = 1 << bit
+        if byte < len(self._bits) and self._bits[byte] & mask:
+            self._bits[byte] &= ~mask & 0xFF
+            self._count -= 1
+    
+    def update(self, ids: Iterable[int]) -> None:
+        """批量添加 ID"""
+        for article_id in ids:
+            self.add(article_id)
+    
+    def __contains__(self, article_id: int) -> bool:
+        if article_id < 0 or article_id >= self.max_dense:
+            return article_id in self._sparse
+        byte, bit = divmod(article_id, 8)
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << bit))
+    
+    def __len__(self) -> int:
+        return self._count
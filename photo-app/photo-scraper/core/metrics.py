@@ -0,0 +1,244 @@
+"""运行指标 - 计数器和耗时直方图，可输出 Prometheus 文本格式和 JSON 摘要
+
+各模块在导入时向共享的 registry 登记指标，记录时按标签（如 status、operation）分组：
+
+    HTTP_SECONDS = registry.histogram('scraper_http_request_seconds', 'HTTP 请求耗时')
+    with HTTP_SECONDS.time(host='example.com'):
+        ...
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple, Optional, Iterable
+
+
+# 默认的耗时分桶上界（秒），覆盖本地写入的毫秒级到慢请求的数十秒
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """标签字典转换为可哈希的键，按名称排序"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Prometheus 标签文本，如 {status="200",le="0.5"}"""
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Prometheus 数值文本，整数不带小数点"""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """只增不减的计数器"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        """增加计数"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        """读取计数"""
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+    
+    def reset(self) -> None:
+        """清空计数"""
+        with self._lock:
+            self._values.clear()
+    
+    def to_prometheus(self) -> List[str]:
+        """Prometheus 文本格式的样本行"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(key)} {_format_value(value)}' for key, value in items]
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """JSON 摘要：每组标签的计数"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [{'labels': dict(key), 'value': value} for key, value in items]
+
+
+class _Series:
+    """直方图中一组标签的数据"""
+    
+    __slots__ = ('buckets', 'count', 'total', 'max')
+    
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Histogram:
+    """按分桶统计的耗时直方图，记录次数、总和和最大值"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.bounds = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, _Series] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels) -> None:
+        """记录一次观测值"""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bounds) + 1)
+            series.buckets[index] += 1
+            series.count += 1
+            series.total += value
+            series.max = max(series.max, value)
+    
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块的耗时，出错时同样记录；也可以用作函数装饰器"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def reset(self) -> None:
+        """清空观测值"""
+        with self._lock:
+            self._series.clear()
+    
+    def _snapshot(self) -> List[Tuple[LabelKey, _Series]]:
+        """复制各组数据，输出时不持有锁"""
+        with self._lock:
+            items = []
+            for key, series in sorted(self._series.items()):
+                copy = _Series(len(series.buckets))
+                copy.buckets = list(series.buckets)
+                copy.count, copy.total, copy.max = series.count, series.total, series.max
+                items.append((key, copy))
+        return items
+    
+    def _quantile(self, series: _Series, q: float) -> float:
+        """按分桶估计分位数：在所在的桶内线性插值，超过最大分桶时取最大值"""
+        rank = q * series.count
+        cumulative = 0
+        for index, count in enumerate(series.buckets):
+            if count and cumulative + count >= rank:
+                if index == len(self.bounds):
+                    return series.max
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = min(self.bounds[index], series.max)
+                return lower + (max(upper, lower) - lower) * (rank - cumulative) / count
+            cumulative += count
+        return series.max
+    
+    def to_prometheus(self) -> List[str]:
+        """Prometheus 文本格式的样本行：累计分桶、总和和次数"""
+        lines = []
+        for key, series in self._snapshot():
+            cumulative = 0
+            for bound, count in zip(self.bounds, series.buckets):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(key, ("le", _format_value(bound)))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(key, ("le", "+Inf"))} {series.count}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(series.total)}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {series.count}')
+        return lines
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """JSON 摘要：每组标签的次数、总和、平均值、估计的 p50/p95 和最大值（秒）"""
+        return [{
+            'labels': dict(key),
+            'count': series.count,
+            'sum': round(series.total, 6),
+            'avg': round(series.total / series.count, 6) if series.count else 0.0,
+            'p50': round(self._quantile(series, 0.5), 6),
+            'p95': round(self._quantile(series, 0.95), 6),
+            'max': round(series.max, 6),
+        } for key, series in self._snapshot()]
+
+
+class MetricsRegistry:
+    """指标注册表：同名指标只创建一次"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, cls, name: str, *args):
+        """按名称返回已有的指标，没有时创建；同名指标的类型必须一致"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已登记为 {metric.kind}")
+            return metric
+    
+    def counter(self, name: str, help_text: str) -> Counter:
+        """获取或创建计数器"""
+        return self._register(Counter, name, help_text)
+    
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._register(Histogram, name, help_text, buckets)
+    
+    def reset(self) -> None:
+        """清空所有指标的数据，指标本身保留"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+    
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4），还没有数据的指标只输出说明"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f'# HELP {name} {metric.help_text}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.to_prometheus())
+        return '\n'.join(lines) + '\n'
+    
+    def summary(self) -> Dict[str, Any]:
+        """JSON 摘要：{指标名: {'type', 'help', 'values'}}，省略还没有数据的指标"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        result = {}
+        for name, metric in metrics:
+            values = metric.summary()
+            if values:
+                result[name] = {'type': metric.kind, 'help': metric.help_text, 'values': values}
+        return result
+
+
+# 进程内共享的注册表
+registry = MetricsRegistry()
@@ -0,0 +1,227 @@
+"""爬取流水线 - 列表页、详情获取、解析、写入分阶段并行执行"""
+import queue
+import threading
+from typing import Iterable, List, Dict, Any, Optional, Callable
+
+from .data_source import DataSource
+from .storage import Storage
+
+
+# 队列结束标记
+_DONE = object()
+
+
+def saved_event(rows: List[Dict[str, Any]], images: Dict[int, List[str]]) -> Dict[str, Any]:
+    """一批文章提交后的进度事件内容：文章数、图片数和最后一篇文章"""
+    return {
+        'articles': len(rows),
+        'images': sum(len(urls) for urls in images.values()),
+        'last_article': {'id': rows[-1]['id'], 'title': rows[-1].get('title', '')},
+    }
+
+
+class CrawlPipeline:
+    """分阶段爬取流水线
+    
+    列表页生产者 → 详情获取线程 → 解析线程 → 单个写入线程，
+    各阶段之间用有界队列连接：下游处理不过来时上游阻塞等待，
+    网络、CPU 和磁盘各自按自己的能力运行。
+    """
+    
+    STAGES = ('fetch', 'parse', 'write')
+    
+    def __init__(self, source: DataSource, storage: Storage, config: Dict[str, Any] = None,
+                 stop_event: Optional[threading.Event] = None,
+                 progress_callback: Optional[Callable[[str], None]] = None,
+                 event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.source = source
+        self.storage = storage
+        self.config = config or {}
+        self.fetch_workers = max(1, int(self.config.get('fetch_workers', 4)))
+        self.parse_workers = max(1, int(self.config.get('parse_workers', 1)))
+        self.batch_size = max(1, int(self.config.get('batch_size', 50)))
+        queue_size = max(1, int(self.config.get('queue_size', 100)))
+        
+        self.stop_event = stop_event or threading.Event()
+        self.progress_callback = progress_callback
+        # 结构化进度事件：(事件类型, 内容)
+        self.event_callback = event_callback
+        
+        self.queues = {stage: queue.Queue(maxsize=queue_size) for stage in self.STAGES}
+        self.processed = {stage: 0 for stage in self.STAGES}
+        self.dropped = 0
+        
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._errors: List[BaseException] = []
+        self._remaining = {}
+    
+    def queue_depths(self) -> Dict[str, int]:
+        """各阶段队列中等待处理的数量"""
+        return {stage: q.qsize() for stage, q in self.queues.items()}
+    
+    def run(self, articles: Iterable[Dict[str, Any]]) -> int:
+        """
+        处理文章直到全部写入或收到停止请求
+        
+        Args:
+            articles: 需要获取详情的文章，在生产者线程中迭代（可以是按页获取列表的生成器）
+        
+        Returns:
+            写入的文章数量
+        """
+        self._remaining = {'fetch': self.fetch_workers, 'parse': self.parse_workers}
+        threads = [threading.Thread(target=self._produce, args=(articles,), name='pipeline-list')]
+        threads += [threading.Thread(target=self._fetch, name=f'pipeline-fetch-{i}')
+                    for i in range(self.fetch_workers)]
+        threads += [threading.Thread(target=self._parse, name=f'pipeline-parse-{i}')
+                    for i in range(self.parse_workers)]
+        threads.append(threading.Thread(target=self._write, name='pipeline-write'))
+        
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        if self._errors:
+            raise self._errors[0]
+        return self.processed['write']
+    
+    def _fail(self, error: BaseException) -> None:
+        """记录错误并让所有阶段尽快退出"""
+        with self._lock:
+            self._errors.append(error)
+        self._abort.set()
+    
+    def _put(self, stage: str, item: Any) -> bool:
+        """放入队列，队列满时等待；流水线中止时返回 False"""
+        while not self._abort.is_set():
+            try:
+                self.queues[stage].put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _get(self, stage: str) -> Any:
+        """从队列取出，流水线中止时返回结束标记"""
+        while not self._abort.is_set():
+            try:
+                return self.queues[stage].get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+    
+    def _finish(self, stage: str, next_stage: str, consumers: int) -> None:
+        """本阶段的最后一个线程退出时通知下游结束"""
+        with self._lock:
+            self._remaining[stage] -= 1
+            last = self._remaining[stage] == 0
+        if last:
+            for _ in range(consumers):
+                self._put(next_stage, _DONE)
+    
+    def _produce(self, articles: Iterable[Dict[str, Any]]) -> None:
+        """生产者：迭代文章（按需获取列表页），放入详情获取队列"""
+        try:
+            for article in articles:
+                if self.stop_event.is_set() or not self._put('fetch', article):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.fetch_workers):
+                self._put('fetch', _DONE)
+    
+    def _fetch(self) -> None:
+        """详情获取：只做网络请求，收到停止请求后丢弃还没获取的文章"""
+        try:
+            while True:
+                article = self._get('fetch')
+                if article is _DONE:
+                    break
+                if self.stop_event.is_set():
+                    with self._lock:
+                        self.dropped += 1
+                    continue
+                raw = self.source.fetch_article_detail(article['id'], article['detail_url'])
+                with self._lock:
+                    self.processed['fetch'] += 1
+                if not self._put('parse', (article, raw)):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._finish('fetch', 'parse', self.parse_workers)
+    
+    def _parse(self) -> None:
+        """解析：把详情合并到文章中，已获取的详情在停止后仍会解析并写入"""
+        try:
+            while True:
+                item = self._get('parse')
+                if item is _DONE:
+                    break
+                article, raw = item
+                detail = self.source.parse_article_detail(article['id'], raw)
+                images = []
+                if detail and detail.get('images'):
+                    images = detail['images']
+                    article.update({
+                        'tags': detail.get('tags', []),
+                        'date': detail.get('date', '')
+                    })
+                with self._lock:
+                    self.processed['parse'] += 1
+                if not self._put('write', (article, images)):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._finish('parse', 'write', 1)
+    
+    def _write(self) -> None:
+        """写入：唯一的写入线程，队列暂时为空或攒满一批时在一个事务中提交"""
+        rows = []
+        images = {}
+        try:
+            while True:
+                try:
+                    item = self.queues['write'].get_nowait()
+                except queue.Empty:
+                    self._write_batch(rows, images)
+                    item = self._get('write')
+                if item is _DONE:
+                    break
+                
+                article, article_images = item
+                print(f"  文章 {article['id']}: {article['title']}，{len(article_images)} 张图片")
+                rows.append(article)
+                if article_images:
+                    images[article['id']] = article_images
+                if len(rows) >= self.batch_size:
+                    self._write_batch(rows, images)
+            
+            self._write_batch(rows, images)
+        except BaseException as e:
+            self._fail(e)
+    
+    def _write_batch(self, rows: List[Dict[str, Any]], images: Dict[int, List[str]]) -> None:
+        """提交一批文章和图片，然后清空"""
+        if not rows:
+            return
+        with self.storage.transaction():
+            self.storage.save_articles(rows)
+            self.storage.save_images_bulk(images)
+        self.processed['write'] += len(rows)
+        if self.event_callback:
+            self.event_callback('saved', dict(saved_event(rows, images), queues=self.queue_depths()))
+        rows.clear()
+        images.clear()
+        
+        if self.progress_callback:
+            depths = self.queue_depths()
+            self.progress_callback(
+                f"已保存 {self.processed['write']} 篇文章"
+                f"（待获取 {depths['fetch']}，待解析 {depths['parse']}，待写入 {depths['write']}）"
+            )
@@ -0,0 +1,32 @@
+"""限速接口 - 控制请求发送的节奏"""
+import random
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class RateLimiter(ABC):
+    """限速器基类，同一个实例由所有并发请求共享"""
+    
+    @abstractmethod
+    def acquire(self, url: str) -> None:
+        """发送请求前调用，必要时阻塞等待"""
+        pass
+    
+    @abstractmethod
+    def record(self, url: str, latency: float, status: Optional[int] = None,
+               retry_after: Optional[float] = None) -> None:
+        """
+        记录请求结果
+        
+        Args:
+            url: 请求地址
+            latency: 耗时（秒）
+            status: HTTP 状态码，网络错误时为 None
+            retry_after: 服务器要求的等待时间（秒）
+        """
+        pass
+    
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的重试等待时间（秒），指数增长并带随机抖动"""
+        delay = min(60.0, 2.0 * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
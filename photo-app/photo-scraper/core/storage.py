@@ -1,6 +1,7 @@
 """存储接口 - 定义数据存储的统一接口"""
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from contextlib import nullcontext
+from typing import List, Dict, Any, Iterable, Set, Optional
 
 
 class Storage(ABC):
@@ -31,6 +32,74 @@ class Storage(ABC):
     def article_exists(self, article_id: int) -> bool:
         """检查文章是否存在"""
         pass
+    
+    def save_articles(self, articles: List[Dict[str, Any]]) -> None:
+        """批量保存文章"""
+        for article in articles:
+            self.save_article(article)
+    
+    def save_images_bulk(self, images: Dict[int, List[str]]) -> None:
+        """批量保存图片，参数为 {文章ID: 图片列表}"""
+        for article_id, urls in images.items():
+            self.save_images(article_id, urls)
+    
+    def flush(self) -> None:
+        """把缓冲中的写入落盘（默认不做处理）"""
+        pass
+    
+    def existing_ids(self, article_ids: Iterable[int]) -> Set[int]:
+        """批量检查文章是否存在，返回已存在的 ID"""
+        return {article_id for article_id in article_ids if self.article_exists(article_id)}
+    
+    def load_known_ids(self) -> None:
+        """加载已存在的文章 ID 索引（默认不做处理）"""
+        pass
+    
+    def get_high_water_mark(self, category: str) -> Optional[int]:
+        """获取分类已爬取的最大文章 ID（默认不记录）"""
+        return None
+    
+    def set_high_water_mark(self, category: str, article_id: int) -> None:
+        """记录分类已爬取的最大文章 ID（默认不记录）"""
+        pass
+    
+    def get_crawl_progress(self, category: str) -> Optional[Dict[str, Any]]:
+        """
+        获取分类的爬取进度（默认不记录）
+        
+        返回 {'next_page', 'max_seen_id', 'status', 'pending'}，没有记录时返回 None；
+        next_page 为 None 表示列表页已经翻完，pending 是还没写入的文章
+        """
+        return None
+    
+    def save_crawl_progress(self, category: str, next_page: Optional[int], max_seen_id: Optional[int],
+                            pending: List[Dict[str, Any]]) -> None:
+        """记录分类的爬取进度：下一个列表页和待获取详情的文章（默认不记录）"""
+        pass
+    
+    def finish_crawl_progress(self, category: str) -> None:
+        """标记分类已爬取完成，清除待获取的文章（默认不记录）"""
+        pass
+    
+    def clear_crawl_progress(self, category: str) -> None:
+        """清除分类的爬取进度（默认不记录）"""
+        pass
+    
+    def get_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取数据库统计（默认不记录）
+        
+        返回 {'total_articles', 'total_images', 'category_stats', 'last_scrapes', 'recent_logs'}
+        """
+        return None
+    
+    def transaction(self):
+        """事务范围，范围内的写入一次提交（默认不做处理）"""
+        return nullcontext()
+    
+    def close(self) -> None:
+        """关闭存储，释放连接等资源"""
+        pass
 
 
 class StorageManager:
@@ -48,6 +117,11 @@ class StorageManager:
             self.active_storage = storage.storage_name
         print(f"✓ 存储已注册: {storage.storage_name}")
     
+    def close(self) -> None:
+        """关闭所有存储"""
+        for storage in self.storages.values():
+            storage.close()
+    
     def get_active_storage(self) -> Storage:
         """获取活动存储"""
         if not self.active_storage:
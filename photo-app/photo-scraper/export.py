@@ -0,0 +1,867 @@
+"""导出查看器数据库 - 从爬虫的工作数据库生成体积小、读取快的只读副本"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import statistics
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from plugins.sqlite_schema import SCHEMA_VERSION, migrate, get_version, split_url, tags_text_sql, check_derived_tables
+
+
+# 只有爬虫写入、查看器不读取的表
+WRITE_ONLY_TABLES = ('scrape_log', 'update_log', 'crawl_state', 'crawl_progress', 'crawl_pending')
+
+# 导出前的整理：删除不再被引用的图片前缀和标签，合并全文索引（删除文章后留下的删除标记），
+# 重新生成随机浏览序列
+COMPACT_STATEMENTS = [
+    'DELETE FROM url_prefixes WHERE id NOT IN (SELECT prefix_id FROM image_files)',
+    'DELETE FROM tags WHERE article_count = 0',
+    "INSERT INTO articles_fts (articles_fts) VALUES ('optimize')",
+    # 重新打乱随机浏览序列：先改成负数避开唯一索引，再按随机顺序编号
+    'UPDATE random_index SET seq = -1 - seq, category_seq = -1 - category_seq',
+    '''
+    UPDATE random_index SET seq = shuffled.seq, category_seq = shuffled.category_seq
+    FROM (
+        SELECT article_id,
+               ROW_NUMBER() OVER (ORDER BY random()) - 1 AS seq,
+               ROW_NUMBER() OVER (PARTITION BY category ORDER BY random()) - 1 AS category_seq
+        FROM random_index
+    ) AS shuffled
+    WHERE shuffled.article_id = random_index.article_id
+    ''',
+]
+
+# 自动选择页大小时尝试的候选值
+PAGE_SIZES = (1024, 2048, 4096, 8192, 16384)
+
+# 冷启动测试使用的查询，与查看器（photo-viewer/src/stores/db.js）一致
+VIEWER_QUERIES = [
+    ('分类统计', 'SELECT category, COUNT(*) as count FROM articles GROUP BY category', ()),
+    ('首页列表', 'SELECT * FROM articles ORDER BY id DESC LIMIT 20 OFFSET 0', ()),
+    ('分类列表', 'SELECT * FROM articles WHERE category = ? ORDER BY id DESC LIMIT 20 OFFSET 0', ('写真集',)),
+    ('文章详情', 'SELECT * FROM articles WHERE id = (SELECT MAX(id) FROM articles)', ()),
+    ('图片列表', 'SELECT image_url FROM images WHERE article_id = (SELECT MAX(id) FROM articles) ORDER BY img_order', ()),
+    ('标题搜索', 'SELECT * FROM articles WHERE title LIKE ? ORDER BY id DESC LIMIT 50', ('%写真%',)),
+    ('全文搜索', f'''
+        SELECT * FROM articles
+        WHERE id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)
+          AND (title LIKE ? OR description LIKE ? OR {tags_text_sql('tags')} LIKE ?)
+        ORDER BY id DESC LIMIT 50
+    ''', ('"人体艺" AND "体艺术"',) + ('%人体艺术%',) * 3),
+    ('热门标签', 'SELECT name, article_count FROM tags WHERE article_count > 0 ORDER BY article_count DESC LIMIT 50', ()),
+    ('标签文章', '''
+        SELECT a.* FROM article_tags at JOIN articles a ON a.id = at.article_id
+        WHERE at.tag_id = (SELECT id FROM tags WHERE name = ?)
+        ORDER BY at.article_id DESC LIMIT 20 OFFSET 0
+    ''', ('写真',)),
+    ('随机文章', 'SELECT * FROM articles ORDER BY RANDOM() LIMIT 1', ()),
+    ('随机索引', '''
+        SELECT a.* FROM random_index r JOIN articles a ON a.id = r.article_id
+        WHERE r.seq = (SELECT MAX(seq) / 2 FROM random_index)
+    ''', ()),
+]
+
+# 增量更新：输出目录中的基础数据库，以及 updates 子目录中的清单和变更集
+BASE_NAME = 'photo.db'
+UPDATES_DIR = 'updates'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 1
+
+# 增量更新的状态库：最近发布版本中每篇文章的摘要，以及每个版本的记录
+DELTA_STATE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS snapshot (
+        article_id INTEGER PRIMARY KEY,
+        article_digest TEXT NOT NULL,
+        images_digest TEXT NOT NULL
+    )
+    ''',
+    # changeset 为空表示该版本没有变更集（首个版本或表结构变化），base_size 不为空表示该版本生成了基础数据库
+    '''
+    CREATE TABLE IF NOT EXISTS versions (
+        version INTEGER PRIMARY KEY,
+        built_at TEXT NOT NULL,
+        schema_version INTEGER NOT NULL,
+        changeset TEXT,
+        changeset_size INTEGER,
+        articles INTEGER NOT NULL DEFAULT 0,
+        images INTEGER NOT NULL DEFAULT 0,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        base_size INTEGER
+    )
+    ''',
+]
+
+# 分片导出：输出目录中的索引和 shards 子目录中的分片
+SHARD_INDEX_NAME = 'index.db'
+SHARDS_DIR = 'shards'
+
+# 查看器首页一屏显示的文章数（db.js getArticles 的默认 limit）
+FIRST_SCREEN_ARTICLES = 20
+
+SHARD_INDEX_SCHEMA = '''
+CREATE TABLE categories (
+    category TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    max_id INTEGER
+);
+CREATE TABLE shards (
+    file TEXT PRIMARY KEY,
+    category TEXT,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL,
+    articles INTEGER NOT NULL,
+    images INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX idx_shards_range ON shards (max_id, min_id);
+CREATE TABLE export_info (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+'''
+
+
+def default_db_path() -> str:
+    """爬虫默认写入的数据库：查看器 public 目录下的 photo.db"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'photo-viewer', 'public', 'photo.db')
+
+
+def file_size(path: str) -> int:
+    """数据库文件大小，包含未合并的 WAL"""
+    size = os.path.getsize(path)
+    if os.path.exists(path + '-wal'):
+        size += os.path.getsize(path + '-wal')
+    return size
+
+
+def table_sizes(conn: sqlite3.Connection) -> Dict[str, int]:
+    """各表和索引占用的字节数，SQLite 没有编译 dbstat 时返回空字典"""
+    try:
+        return dict(conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC'))
+    except sqlite3.OperationalError:
+        return {}
+
+
+def _vacuum_into(conn: sqlite3.Connection, path: str, page_size: Optional[int] = None) -> None:
+    """整理后写入新文件，可同时改变页大小"""
+    if os.path.exists(path):
+        os.remove(path)
+    if page_size:
+        conn.execute(f'PRAGMA page_size = {int(page_size)}')
+    conn.execute('VACUUM INTO ?', (path,))
+
+
+def _write_smallest(conn: sqlite3.Connection, out: str, page_sizes: Iterable[int]) -> Tuple[int, int]:
+    """
+    按各候选页大小分别 VACUUM INTO，保留最小的文件，校验后替换到 out
+    
+    Returns:
+        (页大小, 文件大小)
+    """
+    best_path, best_size, best_page_size = None, None, None
+    for page_size in page_sizes:
+        candidate = f'{out}.{page_size}.tmp'
+        _vacuum_into(conn, candidate, page_size)
+        size = os.path.getsize(candidate)
+        if best_size is None or size < best_size:
+            if best_path:
+                os.remove(best_path)
+            best_path, best_size, best_page_size = candidate, size, page_size
+        else:
+            os.remove(candidate)
+    
+    check = sqlite3.connect(best_path)
+    integrity = check.execute('PRAGMA integrity_check').fetchone()[0]
+    check.close()
+    if integrity != 'ok':
+        os.remove(best_path)
+        raise RuntimeError(f'导出文件校验失败: {integrity}')
+    
+    os.replace(best_path, out)
+    return best_page_size, best_size
+
+
+def build_export(src: str, out: str, page_sizes: Iterable[int] = PAGE_SIZES,
+                 drop_tables: Iterable[str] = WRITE_ONLY_TABLES,
+                 extra_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    生成查看器数据库
+    
+    步骤：VACUUM INTO 临时文件 → 升级到最新结构 → 删除只写表 → ANALYZE → 记录导出信息，
+    然后按各候选页大小再次 VACUUM INTO，保留最小的文件
+    
+    Args:
+        extra_info: 额外写入 export_info 的信息（如增量更新的数据版本）
+    
+    Returns:
+        导出信息（大小、页大小、文章和图片数量等）
+    """
+    if os.path.abspath(src) == os.path.abspath(out):
+        raise ValueError('输出文件不能与源数据库相同：导出会删除爬虫使用的表')
+    if not os.path.exists(src):
+        raise FileNotFoundError(f'数据库文件不存在: {src}')
+    
+    out_dir = os.path.dirname(os.path.abspath(out))
+    os.makedirs(out_dir, exist_ok=True)
+    staging = os.path.join(out_dir, '.export-staging.db')
+    
+    # 只读打开源数据库，不影响正在运行的爬虫
+    src_conn = sqlite3.connect(f'file:{os.path.abspath(src)}?mode=ro', uri=True)
+    _vacuum_into(src_conn, staging)
+    src_conn.close()
+    
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute('PRAGMA journal_mode = DELETE')
+        migrate(conn)
+        for table in drop_tables:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+        # 只写表的自增序号也不需要
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+            conn.execute('DELETE FROM sqlite_sequence WHERE name NOT IN (SELECT name FROM sqlite_master)')
+        for statement in COMPACT_STATEMENTS:
+            conn.execute(statement)
+        conn.execute('ANALYZE')
+        
+        info = {
+            'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'schema_version': get_version(conn),
+            'articles': conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0],
+            'images': conn.execute('SELECT COUNT(*) FROM images').fetchone()[0],
+            'max_article_id': conn.execute('SELECT MAX(id) FROM articles').fetchone()[0],
+        }
+        info.update(extra_info or {})
+        # 标记为导出文件，爬虫拒绝写入
+        conn.execute('CREATE TABLE export_info (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+        conn.executemany('INSERT INTO export_info (key, value) VALUES (?, ?)',
+                         [(key, str(value)) for key, value in info.items()])
+        conn.commit()
+        
+        page_size, size = _write_smallest(conn, out, page_sizes)
+    finally:
+        conn.close()
+        os.remove(staging)
+    
+    info.update({'page_size': page_size, 'size': size})
+    return info
+
+
+def benchmark_open(path: str, rounds: int = 5) -> Dict[str, float]:
+    """
+    冷启动测试：与 sql.js 一样把整个文件读入内存后打开，再执行查看器的常用查询
+    
+    Returns:
+        各步骤耗时的中位数（毫秒），数据库不支持的查询为 None
+    """
+    samples: Dict[str, List[float]] = {'读取并打开': []}
+    for name, _, _ in VIEWER_QUERIES:
+        samples[name] = []
+    
+    for _ in range(rounds):
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            data = f.read()
+        conn = sqlite3.connect(':memory:')
+        conn.deserialize(data)
+        samples['读取并打开'].append(time.perf_counter() - start)
+        
+        for name, sql, params in VIEWER_QUERIES:
+            start = time.perf_counter()
+            try:
+                conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                # 旧结构的数据库没有全文索引等新表
+                continue
+            samples[name].append(time.perf_counter() - start)
+        conn.close()
+    
+    return {name: statistics.median(values) * 1000 if values else None for name, values in samples.items()}
+
+
+def print_build_report(src: str, out: str, info: Dict[str, Any], rounds: int) -> None:
+    """打印大小对比和冷启动测试结果"""
+    src_size = file_size(src)
+    print(f"\n文章: {info['articles']} 篇  图片: {info['images']} 张  结构版本: {info['schema_version']}")
+    print(f"大小: {src_size / 1024:.1f} KB → {info['size'] / 1024:.1f} KB "
+          f"({(info['size'] - src_size) / src_size:+.1%})，页大小 {info['page_size']}")
+    
+    conn = sqlite3.connect(f'file:{os.path.abspath(out)}?mode=ro', uri=True)
+    sizes = table_sizes(conn)
+    conn.close()
+    if sizes:
+        print("\n各表和索引占用:")
+        for name, size in sizes.items():
+            print(f"  {name:28s} {size / 1024:8.1f} KB")
+    
+    if not rounds:
+        return
+    print(f"\n冷启动测试（{rounds} 轮中位数，毫秒）:")
+    before = benchmark_open(src, rounds)
+    after = benchmark_open(out, rounds)
+    print(f"  {'步骤':<12}{'导出前':>10}{'导出后':>10}")
+    for name in before:
+        cells = [f'{value:>10.2f}' if value is not None else f"{'-':>10}" for value in (before[name], after[name])]
+        print(f"  {name:<12}{''.join(cells)}")
+
+
+def _digest(value: Any) -> str:
+    """内容摘要，用于判断文章或图片列表是否变化"""
+    data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _write_json(path: str, data: Any) -> int:
+    """先写临时文件再替换，客户端不会读到写了一半的文件；返回文件大小"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def read_dataset(path: str) -> Tuple[List[str], Dict[int, list], Dict[int, List[str]]]:
+    """
+    在一个读事务中读取全部文章和图片地址
+    
+    Returns:
+        (文章列名, {文章ID: 文章行}, {文章ID: 按顺序排列的图片地址})
+    """
+    conn = sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True)
+    try:
+        conn.execute('BEGIN')
+        cursor = conn.execute('SELECT * FROM articles ORDER BY id')
+        columns = [desc[0] for desc in cursor.description]
+        id_index = columns.index('id')
+        rows = {row[id_index]: list(row) for row in cursor}
+        
+        images: Dict[int, List[str]] = {}
+        for article_id, url in conn.execute('SELECT article_id, image_url FROM images ORDER BY article_id, img_order'):
+            images.setdefault(article_id, []).append(url)
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    return columns, rows, images
+
+
+def diff_dataset(state: sqlite3.Connection, columns: List[str], rows: Dict[int, list],
+                 images: Dict[int, List[str]]) -> Dict[str, Any]:
+    """
+    和上次发布的快照比较
+    
+    Returns:
+        新增或修改的文章行、图片列表有变化的文章、删除的文章ID，以及需要更新的摘要
+    """
+    known = {
+        article_id: (article_digest, images_digest)
+        for article_id, article_digest, images_digest
+        in state.execute('SELECT article_id, article_digest, images_digest FROM snapshot')
+    }
+    
+    changed_rows, changed_images, digests = [], {}, {}
+    for article_id, row in rows.items():
+        urls = images.get(article_id, [])
+        digest = (_digest(row), _digest(urls))
+        old = known.pop(article_id, None)
+        if old == digest:
+            continue
+        digests[article_id] = digest
+        if old is None or old[0] != digest[0]:
+            changed_rows.append(row)
+        # 没有图片的新文章不需要写入空列表
+        if (old is None and urls) or (old is not None and old[1] != digest[1]):
+            changed_images[str(article_id)] = urls
+    
+    return {
+        'columns': columns,
+        'articles': changed_rows,
+        'images': changed_images,
+        'deleted': sorted(known),
+        'digests': digests,
+    }
+
+
+def publish_delta(src: str, out_dir: str, state_path: str, rebase: bool = False,
+                  rebase_ratio: float = 0.5, keep: int = 50) -> Optional[Dict[str, Any]]:
+    """
+    发布新的数据版本：写出相对上一版本的变更集，必要时重新生成基础数据库
+    
+    首次发布、表结构版本变化、基础数据库丢失，或变更集累计大小超过基础数据库的 rebase_ratio 时
+    重新生成基础数据库；旧的变更集保留最近 keep 个，已经在使用的客户端仍可以继续增量更新
+    
+    Returns:
+        新版本的信息，数据没有变化时返回 None
+    """
+    base_path = os.path.join(out_dir, BASE_NAME)
+    if os.path.abspath(src) == os.path.abspath(base_path):
+        raise ValueError('源数据库不能是输出目录中的基础数据库：导出会删除爬虫使用的表')
+    if not os.path.exists(src):
+        raise FileNotFoundError(f'数据库文件不存在: {src}')
+    
+    updates_dir = os.path.join(out_dir, UPDATES_DIR)
+    os.makedirs(updates_dir, exist_ok=True)
+    pending_base = base_path + '.new'
+    
+    state = sqlite3.connect(state_path)
+    try:
+        for statement in DELTA_STATE_SCHEMA:
+            state.execute(statement)
+        state.commit()
+        
+        latest = state.execute('SELECT MAX(version) FROM versions').fetchone()[0] or 0
+        base = state.execute('''
+            SELECT version, schema_version, base_size FROM versions
+            WHERE base_size IS NOT NULL ORDER BY version DESC LIMIT 1
+        ''').fetchone()
+        version = latest + 1
+        
+        # 没有基础版本或表结构变化时，已有的客户端无法应用变更集，只生成基础数据库
+        with_changeset = base is not None and base[1] == SCHEMA_VERSION
+        if not with_changeset or not os.path.exists(base_path):
+            rebase = True
+        elif not rebase:
+            chain_size = state.execute(
+                'SELECT COALESCE(SUM(changeset_size), 0) FROM versions WHERE version > ?', (base[0],)
+            ).fetchone()[0]
+            rebase = chain_size > base[2] * rebase_ratio
+        
+        if rebase:
+            build_export(src, pending_base, extra_info={'data_version': version})
+            # 从导出的文件读取快照，和基础数据库的内容完全一致
+            changes = diff_dataset(state, *read_dataset(pending_base))
+        else:
+            changes = diff_dataset(state, *read_dataset(src))
+            if not (changes['articles'] or changes['images'] or changes['deleted']):
+                return None
+        
+        record = {
+            'version': version,
+            'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'schema_version': SCHEMA_VERSION,
+            'changeset': None,
+            'changeset_size': None,
+            'articles': len(changes['articles']),
+            'images': len(changes['images']),
+            'deleted': len(changes['deleted']),
+            'base_size': os.path.getsize(pending_base) if rebase else None,
+        }
+        if with_changeset:
+            record['changeset'] = f'{version:06d}.json'
+            record['changeset_size'] = _write_json(os.path.join(updates_dir, record['changeset']), {
+                'version': version,
+                'from': latest,
+                'schema_version': SCHEMA_VERSION,
+                'built_at': record['built_at'],
+                'columns': changes['columns'],
+                'articles': changes['articles'],
+                'images': changes['images'],
+                'deleted': changes['deleted'],
+            })
+        
+        with state:
+            state.executemany('DELETE FROM snapshot WHERE article_id = ?',
+                              [(article_id,) for article_id in changes['deleted']])
+            state.executemany(
+                'INSERT OR REPLACE INTO snapshot (article_id, article_digest, images_digest) VALUES (?, ?, ?)',
+                [(article_id, *digest) for article_id, digest in changes['digests'].items()]
+            )
+            state.execute(f"INSERT INTO versions ({', '.join(record)}) VALUES ({', '.join('?' * len(record))})",
+                          list(record.values()))
+        if rebase:
+            os.replace(pending_base, base_path)
+        
+        _prune_changesets(state, updates_dir, keep)
+        write_manifest(state, updates_dir)
+        return record
+    finally:
+        state.close()
+        if os.path.exists(pending_base):
+            os.remove(pending_base)
+
+
+def _prune_changesets(state: sqlite3.Connection, updates_dir: str, keep: int) -> None:
+    """只保留最近 keep 个变更集，更旧版本的客户端重新下载基础数据库"""
+    old = state.execute('''
+        SELECT version, changeset FROM versions WHERE changeset IS NOT NULL
+        ORDER BY version DESC LIMIT -1 OFFSET ?
+    ''', (keep,)).fetchall()
+    with state:
+        for version, name in old:
+            path = os.path.join(updates_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+            state.execute('UPDATE versions SET changeset = NULL WHERE version = ?', (version,))
+
+
+def write_manifest(state: sqlite3.Connection, updates_dir: str) -> Dict[str, Any]:
+    """
+    写出更新清单
+    
+    客户端从自己的数据版本开始，能找到连续的变更集时依次应用；
+    否则下载基础数据库（export_info.data_version 为基础版本），再应用之后的变更集
+    """
+    latest = state.execute('SELECT MAX(version) FROM versions').fetchone()[0]
+    base_version, base_schema, base_size, base_built = state.execute('''
+        SELECT version, schema_version, base_size, built_at FROM versions
+        WHERE base_size IS NOT NULL ORDER BY version DESC LIMIT 1
+    ''').fetchone()
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'latest': latest,
+        'base': {
+            'version': base_version,
+            'file': BASE_NAME,
+            'size': base_size,
+            'schema_version': base_schema,
+            'built_at': base_built,
+        },
+        'changesets': [
+            {
+                'version': version,
+                'from': version - 1,
+                'file': name,
+                'size': size,
+                'schema_version': schema_version,
+                'articles': articles,
+                'images': images,
+                'deleted': deleted,
+            }
+            for version, name, size, schema_version, articles, images, deleted in state.execute('''
+                SELECT version, changeset, changeset_size, schema_version, articles, images, deleted
+                FROM versions WHERE changeset IS NOT NULL ORDER BY version
+            ''')
+        ],
+    }
+    _write_json(os.path.join(updates_dir, MANIFEST_NAME), manifest)
+    return manifest
+
+
+def apply_changeset(conn: sqlite3.Connection, changeset: Dict[str, Any]) -> None:
+    """把变更集应用到导出的数据库（与查看器 db.js 的 applyChangeset 一致），调用方负责事务"""
+    columns = changeset['columns']
+    assignments = ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'id')
+    conn.executemany(f'''
+        INSERT INTO articles ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT(id) DO UPDATE SET {assignments}
+    ''', changeset['articles'])
+    
+    for article_id, urls in changeset['images'].items():
+        conn.execute('DELETE FROM image_files WHERE article_id = ?', (int(article_id),))
+        for order, url in enumerate(urls):
+            prefix, suffix = split_url(url)
+            conn.execute('INSERT OR IGNORE INTO url_prefixes (prefix) VALUES (?)', (prefix,))
+            conn.execute('''
+                INSERT INTO image_files (article_id, prefix_id, suffix, img_order)
+                SELECT ?, id, ?, ? FROM url_prefixes WHERE prefix = ?
+            ''', (int(article_id), suffix, order, prefix))
+    
+    for article_id in changeset['deleted']:
+        conn.execute('DELETE FROM image_files WHERE article_id = ?', (article_id,))
+        conn.execute('DELETE FROM articles WHERE id = ?', (article_id,))
+    
+    conn.execute("UPDATE export_info SET value = ? WHERE key = 'data_version'", (str(changeset['version']),))
+
+
+def apply_updates(db_path: str, updates_dir: str) -> Tuple[int, int]:
+    """
+    把 updates 目录中的变更集依次应用到本地导出的数据库
+    
+    Returns:
+        (应用前的数据版本, 应用后的数据版本)
+    """
+    with open(os.path.join(updates_dir, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        info = dict(conn.execute('SELECT key, value FROM export_info'))
+        if 'data_version' not in info:
+            raise RuntimeError(f'{db_path} 不是增量发布的数据库，请下载基础数据库')
+        start = current = int(info['data_version'])
+        schema_version = int(info['schema_version'])
+        
+        for entry in manifest['changesets']:
+            if entry['version'] <= current:
+                continue
+            if entry['from'] != current or entry['schema_version'] != schema_version:
+                break
+            with open(os.path.join(updates_dir, entry['file']), encoding='utf-8') as f:
+                changeset = json.load(f)
+            # 每个变更集一个事务，中断后从已应用的版本继续
+            with conn:
+                apply_changeset(conn, changeset)
+            current = changeset['version']
+    finally:
+        conn.close()
+    
+    if current < manifest['latest']:
+        raise RuntimeError(f'无法从版本 {current} 增量更新到 {manifest["latest"]}，请下载基础数据库')
+    return start, current
+
+
+def _category_key(category: Optional[str]) -> str:
+    """分类在分片文件名中的标识（分类名可能包含不适合放进地址的字符）"""
+    return hashlib.blake2b((category or '').encode('utf-8'), digest_size=4).hexdigest()
+
+
+def plan_shards(conn: sqlite3.Connection, max_articles: int, by_category: bool) -> List[Dict[str, Any]]:
+    """
+    规划分片：按 ID 从小到大每 max_articles 篇一个分片，只有最新的分片会随新文章增长，
+    旧分片的内容和文件名保持不变，客户端可以长期缓存。最新的分片不足一屏时并入前一个分片，
+    首屏只需要最新的分片
+    
+    Returns:
+        分片列表，每项包含文件名、分类（不按分类分片时为 None）、ID 范围和文章数
+    """
+    if by_category:
+        groups = [row[0] for row in conn.execute('SELECT DISTINCT category FROM articles ORDER BY category')]
+    else:
+        groups = [None]
+    
+    shards = []
+    for category in groups:
+        if by_category:
+            ids = [row[0] for row in conn.execute('SELECT id FROM articles WHERE category IS ? ORDER BY id', (category,))]
+            prefix = f'{_category_key(category)}-'
+        else:
+            ids = [row[0] for row in conn.execute('SELECT id FROM articles ORDER BY id')]
+            prefix = ''
+        chunks = [ids[start:start + max_articles] for start in range(0, len(ids), max_articles)]
+        if len(chunks) > 1 and len(chunks[-1]) < FIRST_SCREEN_ARTICLES:
+            chunks[-2:] = [chunks[-2] + chunks[-1]]
+        for number, chunk in enumerate(chunks):
+            shards.append({
+                'file': f'{prefix}{number:04d}.db',
+                'category': category,
+                'min_id': chunk[0],
+                'max_id': chunk[-1],
+                'articles': len(chunk),
+            })
+    return shards
+
+
+def _write_shard(full: sqlite3.Connection, path: str, shard: Dict[str, Any], by_category: bool,
+                 page_size: int) -> None:
+    """
+    复制完整的导出数据库后删除分片范围之外的文章，表结构、索引和视图与完整导出一致
+    """
+    where = 'id BETWEEN ? AND ?'
+    params: Tuple = (shard['min_id'], shard['max_id'])
+    if by_category:
+        where += ' AND category IS ?'
+        params += (shard['category'],)
+    
+    staging = path + '.staging'
+    _vacuum_into(full, staging)
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute(f'DELETE FROM image_files WHERE article_id NOT IN (SELECT id FROM articles WHERE {where})', params)
+        conn.execute(f'DELETE FROM articles WHERE NOT ({where})', params)
+        for statement in COMPACT_STATEMENTS:
+            conn.execute(statement)
+        conn.execute('ANALYZE')
+        
+        shard['images'] = conn.execute('SELECT COUNT(*) FROM image_files').fetchone()[0]
+        conn.executemany('INSERT OR REPLACE INTO export_info (key, value) VALUES (?, ?)', [
+            ('articles', str(shard['articles'])),
+            ('images', str(shard['images'])),
+            ('max_article_id', str(shard['max_id'])),
+            ('shard', shard['file']),
+            ('shard_category', shard['category'] or ''),
+            ('shard_min_id', str(shard['min_id'])),
+        ])
+        conn.commit()
+        
+        _, shard['size'] = _write_smallest(conn, path, (page_size,))
+    finally:
+        conn.close()
+        os.remove(staging)
+
+
+def build_shards(src: str, out_dir: str, max_articles: int = 1000, by_category: bool = False,
+                 page_sizes: Iterable[int] = PAGE_SIZES) -> Dict[str, Any]:
+    """
+    分片导出：shards/ 下每个分片是一个独立的查看器数据库，index.db 记录分类统计和各分片的范围
+    
+    先写入全部分片，最后替换 index.db，客户端读到的索引引用的分片总是存在；不再使用的旧分片随后删除
+    
+    Returns:
+        完整导出的信息、分片列表和索引文件大小
+    """
+    shards_dir = os.path.join(out_dir, SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok=True)
+    full_path = os.path.join(out_dir, '.shards-full.db')
+    
+    info = build_export(src, full_path, page_sizes)
+    full = sqlite3.connect(full_path)
+    try:
+        shards = plan_shards(full, max_articles, by_category)
+        for shard in shards:
+            _write_shard(full, os.path.join(shards_dir, shard['file']), shard, by_category, info['page_size'])
+        categories = full.execute('SELECT category, COUNT(*), MAX(id) FROM articles GROUP BY category').fetchall()
+    finally:
+        full.close()
+        os.remove(full_path)
+    
+    # 索引只有几十行，用最小的页大小
+    index_staging = os.path.join(out_dir, '.shards-index.db')
+    if os.path.exists(index_staging):
+        os.remove(index_staging)
+    conn = sqlite3.connect(index_staging)
+    try:
+        conn.execute('PRAGMA page_size = 1024')
+        conn.executescript(SHARD_INDEX_SCHEMA)
+        conn.executemany('INSERT INTO categories (category, count, max_id) VALUES (?, ?, ?)', categories)
+        conn.executemany('''
+            INSERT INTO shards (file, category, min_id, max_id, articles, images, size)
+            VALUES (:file, :category, :min_id, :max_id, :articles, :images, :size)
+        ''', shards)
+        conn.executemany('INSERT INTO export_info (key, value) VALUES (?, ?)', [
+            (key, str(info[key])) for key in ('built_at', 'schema_version', 'articles', 'images', 'max_article_id')
+        ] + [('shard_by', 'category' if by_category else 'id'), ('shard_max_articles', str(max_articles))])
+        conn.commit()
+        _, index_size = _write_smallest(conn, os.path.join(out_dir, SHARD_INDEX_NAME), (1024,))
+    finally:
+        conn.close()
+        os.remove(index_staging)
+    
+    current = {shard['file'] for shard in shards}
+    for name in os.listdir(shards_dir):
+        if name.endswith('.db') and name not in current:
+            os.remove(os.path.join(shards_dir, name))
+    
+    return {'info': info, 'shards': shards, 'index_size': index_size}
+
+
+def print_shards_report(result: Dict[str, Any]) -> None:
+    """打印各分片的范围和大小，以及首屏需要下载的大小"""
+    info, shards = result['info'], result['shards']
+    print(f"\n{'分片':<26}{'分类':<10}{'ID 范围':>14}{'文章':>7}{'图片':>8}{'大小':>12}")
+    for shard in shards:
+        id_range = f"{shard['min_id']}-{shard['max_id']}"
+        print(f"{SHARDS_DIR + '/' + shard['file']:<26}{(shard['category'] or '-'):<10}{id_range:>14}"
+              f"{shard['articles']:>7}{shard['images']:>8}{shard['size'] / 1024:>9.1f} KB")
+    
+    # 首页按 ID 倒序显示一屏，需要各分组中从最新开始、凑够一屏文章的分片
+    needed, counts = [], {}
+    for shard in reversed(shards):
+        if counts.get(shard['category'], 0) < FIRST_SCREEN_ARTICLES:
+            needed.append(shard)
+            counts[shard['category']] = counts.get(shard['category'], 0) + shard['articles']
+    first_screen = result['index_size'] + sum(shard['size'] for shard in needed)
+    print(f"\n索引: {SHARD_INDEX_NAME} ({result['index_size'] / 1024:.1f} KB)")
+    print(f"首屏下载: {first_screen / 1024:.1f} KB（索引 + {len(needed)} 个最新分片），"
+          f"完整导出 {info['size'] / 1024:.1f} KB")
+
+
+def main():
+    """主函数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='导出查看器数据库')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help='生成整理过的只读数据库')
+    build.add_argument('--src', type=str, default=default_db_path(), help='爬虫的工作数据库（默认: 查看器 public/photo.db）')
+    build.add_argument('--out', type=str, required=True, help='导出文件路径，不能与源数据库相同')
+    build.add_argument('--page-size', type=int, help='页大小，不指定时自动选择文件最小的')
+    build.add_argument('--keep-tables', action='store_true', help='保留只写表（爬取日志、爬取进度等）')
+    build.add_argument('--rounds', type=int, default=5, help='冷启动测试轮数，0 表示不测试')
+    
+    delta = subparsers.add_parser('delta', help='发布新的数据版本（基础数据库 + 增量变更集）')
+    delta.add_argument('--src', type=str, default=default_db_path(), help='爬虫的工作数据库（默认: 查看器 public/photo.db）')
+    delta.add_argument('--out-dir', type=str, required=True, help='输出目录：基础数据库 photo.db 和 updates/ 目录')
+    delta.add_argument('--state', type=str, default='delta_state.db', help='已发布版本的状态库（默认: delta_state.db）')
+    delta.add_argument('--rebase', action='store_true', help='重新生成基础数据库')
+    delta.add_argument('--rebase-ratio', type=float, default=0.5,
+                       help='变更集累计大小超过基础数据库的该比例时自动重新生成（默认: 0.5）')
+    delta.add_argument('--keep', type=int, default=50, help='保留的变更集数量（默认: 50）')
+    
+    apply = subparsers.add_parser('apply', help='把变更集应用到本地的导出数据库')
+    apply.add_argument('--db', type=str, required=True, help='本地的导出数据库')
+    apply.add_argument('--updates', type=str, required=True, help='包含 manifest.json 的 updates 目录')
+    
+    shards = subparsers.add_parser('shards', help='按 ID 范围（可选按分类）分片导出')
+    shards.add_argument('--src', type=str, default=default_db_path(), help='爬虫的工作数据库（默认: 查看器 public/photo.db）')
+    shards.add_argument('--out-dir', type=str, required=True, help='输出目录：索引 index.db 和 shards/ 目录')
+    shards.add_argument('--max-articles', type=int, default=1000, help='每个分片最多的文章数（默认: 1000）')
+    shards.add_argument('--by-category', action='store_true', help='先按分类分组，再按 ID 范围分片')
+    shards.add_argument('--page-size', type=int, help='页大小，不指定时自动选择文件最小的')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        print("=" * 60)
+        print(f"导出查看器数据库: {args.src} → {args.out}")
+        print("=" * 60)
+        try:
+            info = build_export(
+                args.src, args.out,
+                page_sizes=[args.page_size] if args.page_size else PAGE_SIZES,
+                drop_tables=() if args.keep_tables else WRITE_ONLY_TABLES
+            )
+        except (ValueError, FileNotFoundError, RuntimeError) as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        print_build_report(args.src, args.out, info, args.rounds)
+        print(f"\n✓ 已导出 {args.out}")
+    
+    elif args.command == 'delta':
+        try:
+            record = publish_delta(args.src, args.out_dir, args.state, rebase=args.rebase,
+                                   rebase_ratio=args.rebase_ratio, keep=args.keep)
+        except (ValueError, FileNotFoundError, RuntimeError) as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        if record is None:
+            print("✓ 数据没有变化，不发布新版本")
+            return
+        print(f"✓ 已发布版本 {record['version']}: 文章 {record['articles']} 篇，"
+              f"图片有变化 {record['images']} 篇，删除 {record['deleted']} 篇")
+        if record['changeset']:
+            print(f"  变更集: {UPDATES_DIR}/{record['changeset']} ({record['changeset_size'] / 1024:.1f} KB)")
+        if record['base_size']:
+            print(f"  基础数据库: {BASE_NAME} ({record['base_size'] / 1024:.1f} KB)")
+    
+    elif args.command == 'apply':
+        try:
+            start, current = apply_updates(args.db, args.updates)
+        except (OSError, sqlite3.Error, RuntimeError) as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        print(f"✓ 数据版本: {start} → {current}" if current != start else f"✓ 已是最新版本 {current}")
+        
+        # 变更集只写基础表，派生表靠数据库中的触发器同步
+        conn = sqlite3.connect(args.db)
+        try:
+            problems = check_derived_tables(conn)
+        finally:
+            conn.close()
+        if problems:
+            print("✗ 派生表与数据不一致（数据库缺少触发器？请重新下载基础数据库）:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+    
+    elif args.command == 'shards':
+        print("=" * 60)
+        print(f"分片导出: {args.src} → {args.out_dir}")
+        print("=" * 60)
+        try:
+            result = build_shards(
+                args.src, args.out_dir,
+                max_articles=max(1, args.max_articles),
+                by_category=args.by_category,
+                page_sizes=[args.page_size] if args.page_size else PAGE_SIZES
+            )
+        except (ValueError, FileNotFoundError, RuntimeError) as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        print_shards_report(result)
+        print(f"\n✓ 已导出 {len(result['shards'])} 个分片到 {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
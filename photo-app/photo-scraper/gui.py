@@ -2,7 +2,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
-import sqlite3
 from datetime import datetime
 from scraper import PhotoScraper
 
@@ -56,6 +55,10 @@ class ScraperGUI:
         config = {
             'base_url': 'https://www.tuao.cc',
             'db_path': self.db_path,
+            'storage': {
+                'persistent': True,
+                'write_behind': True
+            },
             'scraper': {
                 'user_agents': [
                     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
@@ -116,9 +119,14 @@ class ScraperGUI:
         skip_check = ttk.Checkbutton(frame, text="跳过已存在的文章", variable=self.skip_existing_var)
         skip_check.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
         
+        # 从上次中断处继续
+        self.resume_var = tk.BooleanVar(value=False)
+        resume_check = ttk.Checkbutton(frame, text="从上次中断处继续", variable=self.resume_var)
+        resume_check.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
         # 按钮框架
         btn_frame = ttk.Frame(frame)
-        btn_frame.grid(row=3, column=0, columnspan=2, pady=(10, 0))
+        btn_frame.grid(row=4, column=0, columnspan=2, pady=(10, 0))
         
         # 开始按钮
         self.start_btn = ttk.Button(btn_frame, text="▶️ 开始爬取", command=self.start_scrape, width=15)
@@ -237,6 +245,7 @@ class ScraperGUI:
             return
         
         skip_existing = self.skip_existing_var.get()
+        resume = self.resume_var.get()
         
         # 更新状态
         self.is_running = True
@@ -253,7 +262,7 @@ class ScraperGUI:
         # 在后台线程中执行
         thread = threading.Thread(
             target=self.run_scrape,
-            args=(category, max_pages, skip_existing),
+            args=(category, max_pages, skip_existing, resume),
             daemon=True
         )
         thread.start()
@@ -264,10 +273,11 @@ class ScraperGUI:
             return
         
         self.should_stop = True
+        self.scraper.stop()
         self.log("正在停止爬虫...")
         self.stop_btn.config(state='disabled')
     
-    def run_scrape(self, category, max_pages, skip_existing):
+    def run_scrape(self, category, max_pages, skip_existing, resume=False):
         """执行爬取任务"""
         total_count = 0
         
@@ -292,7 +302,8 @@ class ScraperGUI:
                     category,
                     max_pages=max_pages,
                     skip_existing=skip_existing,
-                    progress_callback=progress_callback
+                    progress_callback=progress_callback,
+                    resume=resume
                 )
                 total_count = count
                 self.root.after(0, lambda: self.log(f"完成！共爬取 {count} 篇文章"))
@@ -301,7 +312,8 @@ class ScraperGUI:
                 stats = self.scraper.scrape_all_categories(
                     max_pages_per_category=max_pages,
                     skip_existing=skip_existing,
-                    progress_callback=progress_callback
+                    progress_callback=progress_callback,
+                    resume=resume
                 )
                 total_count = sum(stats.values())
                 stats_text = ', '.join([f'{k}:{v}篇' for k, v in stats.items()])
@@ -316,6 +328,7 @@ class ScraperGUI:
             self.root.after(0, lambda: messagebox.showerror("错误", error_msg))
         
         finally:
+            self.scraper.close()
             self.is_running = False
             self.should_stop = False
             self.root.after(0, self.finish_scrape)
@@ -339,20 +352,11 @@ class ScraperGUI:
     def update_db_stats(self):
         """更新数据库统计"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 总文章数
-            cursor.execute('SELECT COUNT(*) FROM articles')
-            total_articles = cursor.fetchone()[0]
-            self.db_articles_label.config(text=str(total_articles))
-            
-            # 总图片数
-            cursor.execute('SELECT COUNT(*) FROM images')
-            total_images = cursor.fetchone()[0]
-            self.db_images_label.config(text=str(total_images))
-            
-            conn.close()
+            # 统计表由触发器维护，每 2 秒读取一次不会扫描文章和图片
+            stats = self.scraper.get_stats()
+            if stats:
+                self.db_articles_label.config(text=str(stats['total_articles']))
+                self.db_images_label.config(text=str(stats['total_images']))
         except Exception as e:
             pass
 
@@ -0,0 +1,205 @@
+"""页面解析 - 从列表页和详情页提取数据
+
+默认使用 lxml + 预编译 XPath，只把命中的节点转换成 Python 对象；
+lxml 解析失败时回退到 BeautifulSoup，两种引擎的输出保持一致。
+"""
+import re
+from urllib.parse import urljoin
+from typing import List, Dict, Any, Tuple
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - 没有 lxml 时只能使用 BeautifulSoup
+    etree = None
+
+
+ENGINES = ('lxml', 'bs4')
+
+ARTICLE_ID_RE = re.compile(r'/Content/(\d+)\.html')
+DATE_RE = re.compile(r'日期：(\d{4}-\d{2}-\d{2})')
+
+
+def _has_class(name: str) -> str:
+    """XPath 中等价于 CSS .name 的条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# 与 BeautifulSoup.get_text() 一致：不包含注释、script 和 style 中的文本
+_TEXT = "text()[not(ancestor::script) and not(ancestor::style)]"
+
+if etree is not None:
+    _LIST_ITEMS = etree.XPath(f"//*[{_has_class('index-imgs')}]")
+    _ITEM_LINK = etree.XPath(f"(.//a[{_has_class('index-imgcontent-img')}])[1]")
+    _ITEM_TITLE = etree.XPath(f"(.//a[{_has_class('index-imgcontent-title')}])[1]")
+    _ITEM_IMG = etree.XPath(f"(.//img[{_has_class('lazyimg')}])[1]")
+    _NEXT_LINK = etree.XPath("boolean(//li//a[@aria-label='Next'])")
+    _DETAIL_TITLE = etree.XPath(f"(//h1[{_has_class('content-title')}])[1]")
+    _TAG_LINKS = etree.XPath(f"//*[{_has_class('text-primary')}]//a[contains(@href, '/Articles/Tags')]")
+    _DATE_TEXT = etree.XPath(f"(//*[{_has_class('text-primary')}])[1]//{_TEXT}")
+    _CONTENT_IMGS = etree.XPath("(//*[@id='rawContent'])[1]//img")
+    _STRINGS = etree.XPath(f".//{_TEXT}")
+
+
+def parse_article_list(html: str, base_url: str, engine: str = 'lxml') -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    解析列表页
+    
+    Returns:
+        (文章列表, 是否有下一页)，文章不包含分类字段
+    """
+    if engine == 'lxml' and etree is not None:
+        try:
+            return _parse_list_lxml(html, base_url)
+        except (etree.Error, ValueError) as e:
+            print(f"lxml 解析列表页失败，改用 BeautifulSoup: {e}")
+    return _parse_list_bs4(html, base_url)
+
+
+def parse_article_detail(html: str, base_url: str, engine: str = 'lxml') -> Dict[str, Any]:
+    """
+    解析详情页
+    
+    Returns:
+        {'title', 'tags', 'date', 'images'}
+    """
+    if engine == 'lxml' and etree is not None:
+        try:
+            return _parse_detail_lxml(html, base_url)
+        except (etree.Error, ValueError) as e:
+            print(f"lxml 解析详情页失败，改用 BeautifulSoup: {e}")
+    return _parse_detail_bs4(html, base_url)
+
+
+def _make_article(base_url: str, detail_url: str, title: str,
+                  thumbnail: str, description: str) -> Dict[str, Any]:
+    """组装文章，详情地址中没有 ID 时返回 None"""
+    match = ARTICLE_ID_RE.search(detail_url)
+    if not match:
+        return None
+    return {
+        'id': int(match.group(1)),
+        'title': title,
+        'thumbnail': urljoin(base_url, thumbnail),
+        'description': description,
+        'detail_url': urljoin(base_url, detail_url),
+    }
+
+
+def _html_root(html: str):
+    """用 lxml 解析 HTML，统一按 UTF-8 字节解析以支持带编码声明的页面"""
+    root = etree.fromstring(html.encode('utf-8'), etree.HTMLParser(encoding='utf-8'))
+    if root is None:
+        raise ValueError('空页面')
+    return root
+
+
+def _strip_text(element) -> str:
+    """等价于 get_text(strip=True)"""
+    return ''.join(text.strip() for text in _STRINGS(element))
+
+
+def _parse_list_lxml(html: str, base_url: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """lxml 解析列表页"""
+    root = _html_root(html)
+    articles = []
+    for item in _LIST_ITEMS(root):
+        link = _ITEM_LINK(item)
+        title_link = _ITEM_TITLE(item)
+        if not link or not title_link:
+            continue
+        img = _ITEM_IMG(item)
+        article = _make_article(
+            base_url,
+            link[0].get('href', ''),
+            title_link[0].get('title', '').strip(),
+            img[0].get('data-original', '') if img else '',
+            link[0].get('title', '').strip(),
+        )
+        if article:
+            articles.append(article)
+    return articles, _NEXT_LINK(root)
+
+
+def _parse_detail_lxml(html: str, base_url: str) -> Dict[str, Any]:
+    """lxml 解析详情页"""
+    root = _html_root(html)
+    
+    title_elem = _DETAIL_TITLE(root)
+    title = _strip_text(title_elem[0]) if title_elem else ''
+    
+    tags = []
+    for tag_link in _TAG_LINKS(root):
+        tag = _strip_text(tag_link)
+        if tag:
+            tags.append(tag)
+    
+    date = ''
+    date_match = DATE_RE.search(''.join(_DATE_TEXT(root)))
+    if date_match:
+        date = date_match.group(1)
+    
+    images = [urljoin(base_url, img.get('src')) for img in _CONTENT_IMGS(root) if img.get('src')]
+    
+    return {'title': title, 'tags': tags, 'date': date, 'images': images}
+
+
+def _parse_list_bs4(html: str, base_url: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """BeautifulSoup 解析列表页"""
+    soup = BeautifulSoup(html, 'lxml' if etree is not None else 'html.parser')
+    articles = []
+    for item in soup.select('.index-imgs'):
+        try:
+            link = item.select_one('a.index-imgcontent-img')
+            title_link = item.select_one('a.index-imgcontent-title')
+            img = item.select_one('img.lazyimg')
+            
+            if not link or not title_link:
+                continue
+            
+            article = _make_article(
+                base_url,
+                link.get('href', ''),
+                title_link.get('title', '').strip(),
+                img.get('data-original', '') if img else '',
+                link.get('title', '').strip(),
+            )
+            if article:
+                articles.append(article)
+        except Exception as e:
+            print(f"解析文章项出错: {e}")
+            continue
+    
+    has_next = bool(soup.select('li a[aria-label="Next"]'))
+    return articles, has_next
+
+
+def _parse_detail_bs4(html: str, base_url: str) -> Dict[str, Any]:
+    """BeautifulSoup 解析详情页"""
+    soup = BeautifulSoup(html, 'lxml' if etree is not None else 'html.parser')
+    
+    title_elem = soup.select_one('h1.content-title')
+    title = title_elem.get_text(strip=True) if title_elem else ''
+    
+    tags = []
+    for tag_link in soup.select('.text-primary a[href*="/Articles/Tags"]'):
+        tag = tag_link.get_text(strip=True)
+        if tag:
+            tags.append(tag)
+    
+    date = ''
+    date_elem = soup.select_one('.text-primary')
+    if date_elem:
+        date_match = DATE_RE.search(date_elem.get_text())
+        if date_match:
+            date = date_match.group(1)
+    
+    images = []
+    raw_content = soup.select_one('#rawContent')
+    if raw_content:
+        for img in raw_content.select('img'):
+            img_url = img.get('src', '')
+            if img_url:
+                images.append(urljoin(base_url, img_url))
+    
+    return {'title': title, 'tags': tags, 'date': date, 'images': images}
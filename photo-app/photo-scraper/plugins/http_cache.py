@@ -0,0 +1,169 @@
+"""HTTP 响应缓存 - 持久化到 SQLite，支持条件请求和 LRU 淘汰"""
+import re
+import time
+import zlib
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+
+# 默认的 TTL 规则（秒）：详情页基本不变，列表页很快会有新文章
+DEFAULT_DETAIL_TTL = 30 * 24 * 3600
+DEFAULT_LIST_TTL = 10 * 60
+
+# 命中时的访问时间先记在内存中，积累到这么多条或写入、关闭时再批量落盘
+ACCESS_FLUSH_SIZE = 500
+
+
+class CacheEntry:
+    """缓存条目"""
+    
+    def __init__(self, url: str, body: str, etag: Optional[str],
+                 last_modified: Optional[str], fetched_at: float):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+    
+    def validators(self) -> Dict[str, str]:
+        """条件请求头"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """按 URL 缓存响应正文和校验信息（ETag/Last-Modified）"""
+    
+    def __init__(self, path: str, config: Dict[str, Any] = None):
+        self.path = path
+        self.config = config or {}
+        self.max_bytes = int(float(self.config.get('max_mb', 512)) * 1024 * 1024)
+        self.default_ttl = float(self.config.get('default_ttl', 3600))
+        self.ttl_rules: List[Tuple[re.Pattern, float]] = [
+            (re.compile(pattern), float(ttl))
+            for pattern, ttl in self.config.get('ttl_rules', [
+                (r'/Content/\d+\.html', self.config.get('detail_ttl', DEFAULT_DETAIL_TTL)),
+                (r'/Articles', self.config.get('list_ttl', DEFAULT_LIST_TTL)),
+            ])
+        ]
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        # URL -> 还没写入的最近访问时间
+        self._pending_access: Dict[str, float] = {}
+    
+    def _connection(self) -> sqlite3.Connection:
+        """获取缓存库连接，关闭后再次使用时重新打开"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access)')
+            conn.commit()
+            self._total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            self._conn = conn
+        return self._conn
+    
+    def ttl_for(self, url: str) -> float:
+        """按 URL 类型获取 TTL，第一条匹配的规则生效"""
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+    
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """缓存是否仍在有效期内"""
+        return time.time() - entry.fetched_at < self.ttl_for(entry.url)
+    
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """读取缓存，命中时只在内存中记录访问时间，不逐条提交"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._pending_access[url] = time.time()
+            if len(self._pending_access) >= ACCESS_FLUSH_SIZE:
+                self._flush_access(conn)
+                conn.commit()
+        body = zlib.decompress(row[0]).decode('utf-8')
+        return CacheEntry(url, body, row[1], row[2], row[3])
+    
+    def put(self, url: str, body: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """写入缓存"""
+        data = zlib.compress(body.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            # 先写入积累的访问时间，淘汰时按最新的访问顺序，也不会覆盖本条的访问时间
+            self._flush_access(conn)
+            old = conn.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO responses
+                (url, body, etag, last_modified, fetched_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, data, etag, last_modified, now, now, len(data)))
+            self._total_bytes += len(data) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+    
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """服务器返回 304 时刷新缓存时间，响应带有新的 ETag/Last-Modified 时替换保存的校验信息"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._flush_access(conn)
+            conn.execute('''
+                UPDATE responses SET fetched_at = ?, last_access = ?,
+                    etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+            ''', (now, now, etag, last_modified, url))
+            conn.commit()
+    
+    def _flush_access(self, conn: sqlite3.Connection) -> None:
+        """把内存中的访问时间写入缓存库，由调用方提交"""
+        if self._pending_access:
+            conn.executemany('UPDATE responses SET last_access = ? WHERE url = ?',
+                             [(accessed, url) for url, accessed in self._pending_access.items()])
+            self._pending_access.clear()
+    
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """按最近访问时间淘汰，直到总大小降到上限的 90%"""
+        target = self.max_bytes * 0.9
+        rows = conn.execute('SELECT url, size FROM responses ORDER BY last_access').fetchall()
+        evicted = []
+        for url, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((url,))
+            self._total_bytes -= size
+        conn.executemany('DELETE FROM responses WHERE url = ?', evicted)
+    
+    def close(self) -> None:
+        """写入积累的访问时间并关闭缓存连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._flush_access(self._conn)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,111 @@
+"""自适应限速器 - 按主机的令牌桶 + AIMD 调速"""
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional
+from core.rate_limiter import RateLimiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostBucket:
+    """单个主机的令牌桶"""
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+    
+    def refill(self, now: float) -> None:
+        """按当前速率补充令牌"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    自适应限速器
+    
+    每个主机一个令牌桶，速率按 AIMD 调整：请求成功且延迟正常时线性加速，
+    遇到 429/503、网络错误或延迟过高时按比例减速。Retry-After 会暂停该主机的所有请求。
+    """
+    
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.initial_rate = float(self.config.get('rate', 1.0))
+        self.min_rate = float(self.config.get('min_rate', 0.2))
+        self.max_rate = float(self.config.get('max_rate', 10.0))
+        self.burst = float(self.config.get('burst', 1.0))
+        self.increase = float(self.config.get('increase', 0.1))
+        self.decrease = float(self.config.get('decrease', 0.5))
+        self.latency_target = float(self.config.get('latency_target', 3.0))
+        # 两次减速的最小间隔，避免同一波并发失败把速率连续减半
+        self.cooldown = float(self.config.get('cooldown', 2.0))
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+    
+    def _bucket(self, url: str) -> _HostBucket:
+        """获取主机的令牌桶"""
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = _HostBucket(self.initial_rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+    
+    def rate(self, url: str) -> float:
+        """主机当前的速率（请求/秒）"""
+        return self._bucket(url).rate
+    
+    def acquire(self, url: str) -> None:
+        """取得一个令牌，没有令牌或主机被暂停时等待"""
+        bucket = self._bucket(url)
+        while True:
+            with bucket.lock:
+                now = time.monotonic()
+                bucket.refill(now)
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                elif bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                else:
+                    wait = (1 - bucket.tokens) / bucket.rate
+            # 加一点抖动，避免多个线程同时醒来
+            time.sleep(wait * random.uniform(1.0, 1.2))
+    
+    def record(self, url: str, latency: float, status: Optional[int] = None,
+               retry_after: Optional[float] = None) -> None:
+        """根据请求结果调整速率"""
+        bucket = self._bucket(url)
+        with bucket.lock:
+            now = time.monotonic()
+            if retry_after:
+                bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+            
+            throttled = status is None or status in (429, 503)
+            if throttled or latency > self.latency_target:
+                if now - bucket.last_decrease >= self.cooldown:
+                    factor = self.decrease if throttled else (1 + self.decrease) / 2
+                    bucket.rate = max(self.min_rate, bucket.rate * factor)
+                    bucket.last_decrease = now
+            elif status < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
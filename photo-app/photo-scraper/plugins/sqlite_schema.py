@@ -0,0 +1,518 @@
+"""数据库结构迁移 - 用 PRAGMA user_version 记录版本，按顺序升级
+
+爬虫的 SQLiteStorage 和查看器的数据库工具（photo-viewer/tools）共用这里的迁移，
+修改表结构时在 MIGRATIONS 末尾追加新版本，不要修改已发布的版本。
+"""
+import sqlite3
+from typing import List, Tuple
+
+
+def _url_prefix_sql(column: str) -> str:
+    """SQL 表达式：地址中最后一个 / 及之前的部分，与 split_url 一致"""
+    return f"substr({column}, 1, length(rtrim({column}, replace({column}, '/', ''))))"
+
+
+def _json_each_sql(column: str) -> str:
+    """SQL 表值函数：展开 JSON 标签数组，不是合法 JSON 时没有行"""
+    return f"json_each(CASE WHEN json_valid({column}) THEN {column} END)"
+
+
+def tags_text_sql(column: str) -> str:
+    """SQL 表达式：把 JSON 标签数组拼成空格分隔的文本（标签按 ASCII 转义保存，不能直接搜索）"""
+    return f"(SELECT group_concat(value, ' ') FROM {_json_each_sql(column)})"
+
+
+def _link_tags_sql(article_id: str, column: str) -> str:
+    """触发器语句：登记新标签，再关联文章和标签"""
+    return f'''INSERT INTO tags (name)
+            SELECT DISTINCT value FROM {_json_each_sql(column)}
+            WHERE type = 'text' AND value <> '' AND value NOT IN (SELECT name FROM tags);
+            INSERT INTO article_tags (article_id, tag_id)
+            SELECT DISTINCT {article_id}, t.id FROM {_json_each_sql(column)} j JOIN tags t ON t.name = j.value;'''
+
+
+def _append_random_sql(article: str) -> str:
+    """触发器语句：把文章追加到全部文章和所在分类的随机序列末尾"""
+    return f'''INSERT INTO random_index (article_id, category, seq, category_seq) VALUES (
+                {article}.id, {article}.category,
+                (SELECT COALESCE(MAX(seq) + 1, 0) FROM random_index),
+                (SELECT COALESCE(MAX(category_seq) + 1, 0) FROM random_index WHERE category IS {article}.category)
+            );'''
+
+
+def _count_category_sql(category: str, delta: int) -> str:
+    """触发器语句：调整分类的文章数，分类第一次出现时插入"""
+    return f'''INSERT INTO category_stats (category, articles) VALUES (IFNULL({category}, ''), {delta})
+            ON CONFLICT(category) DO UPDATE SET articles = articles + {delta};'''
+
+
+def _record_scrape_sql(rows: str) -> str:
+    """SQL 语句：把 VALUES 或 SELECT 给出的 (分类, 日期, 文章数, 时间) 记为分类最近一次爬取"""
+    return f'''INSERT INTO category_stats (category, last_scrape_date, last_scrape_count, last_scrape_at)
+            {rows}
+            ON CONFLICT(category) DO UPDATE SET
+                last_scrape_date = excluded.last_scrape_date,
+                last_scrape_count = excluded.last_scrape_count,
+                last_scrape_at = excluded.last_scrape_at;'''
+
+
+def split_url(url: str) -> Tuple[str, str]:
+    """把地址拆成 (前缀, 文件名)，前缀包含最后一个 /"""
+    idx = url.rfind('/') + 1
+    return url[:idx], url[idx:]
+
+
+# (版本号, 说明, SQL 语句列表)
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, '基础表结构', [
+        '''
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            category TEXT,
+            thumbnail TEXT,
+            description TEXT,
+            detail_url TEXT,
+            date TEXT,
+            tags TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER,
+            image_url TEXT NOT NULL,
+            img_order INTEGER,
+            FOREIGN KEY (article_id) REFERENCES articles (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS scrape_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scrape_date DATE,
+            category TEXT,
+            articles_count INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            category TEXT PRIMARY KEY,
+            high_water_id INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # 可恢复的爬取进度：下一个列表页及已列出但还没写入的文章
+        '''
+        CREATE TABLE IF NOT EXISTS crawl_progress (
+            category TEXT PRIMARY KEY,
+            next_page INTEGER,
+            max_seen_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'running',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS crawl_pending (
+            article_id INTEGER PRIMARY KEY,
+            category TEXT NOT NULL,
+            article TEXT NOT NULL
+        )
+        ''',
+    ]),
+    (2, '查看器常用查询的索引', [
+        # 详情页：WHERE article_id = ? ORDER BY img_order
+        'CREATE INDEX IF NOT EXISTS idx_images_article ON images (article_id, img_order)',
+        # 分类列表：WHERE category = ? ORDER BY id DESC
+        'CREATE INDEX IF NOT EXISTS idx_articles_category ON articles (category, id)',
+    ]),
+    (3, '图片地址按前缀去重', [
+        # 同一目录的图片共用前缀（最后一个 / 及之前的部分），每行只存文件名
+        '''
+        CREATE TABLE url_prefixes (
+            id INTEGER PRIMARY KEY,
+            prefix TEXT NOT NULL UNIQUE
+        )
+        ''',
+        '''
+        CREATE TABLE image_files (
+            id INTEGER PRIMARY KEY,
+            article_id INTEGER,
+            prefix_id INTEGER NOT NULL,
+            suffix TEXT NOT NULL,
+            img_order INTEGER,
+            FOREIGN KEY (article_id) REFERENCES articles (id),
+            FOREIGN KEY (prefix_id) REFERENCES url_prefixes (id)
+        )
+        ''',
+        f'''
+        INSERT INTO url_prefixes (prefix)
+        SELECT DISTINCT {_url_prefix_sql('image_url')} FROM images ORDER BY 1
+        ''',
+        f'''
+        INSERT INTO image_files (id, article_id, prefix_id, suffix, img_order)
+        SELECT i.id, i.article_id, p.id, substr(i.image_url, length(p.prefix) + 1), i.img_order
+        FROM images i JOIN url_prefixes p ON p.prefix = {_url_prefix_sql('i.image_url')}
+        ''',
+        'DROP TABLE images',
+        'CREATE INDEX idx_image_files_article ON image_files (article_id, img_order)',
+        # 查询仍然使用 images，与原来的表结构一致
+        '''
+        CREATE VIEW images AS
+        SELECT f.id AS id, f.article_id AS article_id, p.prefix || f.suffix AS image_url, f.img_order AS img_order
+        FROM image_files f JOIN url_prefixes p ON p.id = f.prefix_id
+        ''',
+    ]),
+    (4, '标题、简介和标签的全文搜索索引', [
+        # trigram 分词不依赖中文分词，可以匹配任意 3 个字以上的子串；
+        # 不保存内容和位置（detail=none）以减小体积，查询时按三字组检索后再用 LIKE 确认
+        '''
+        CREATE VIRTUAL TABLE articles_fts USING fts5(
+            title, description, tags,
+            content='', tokenize='trigram', detail=none, columnsize=0
+        )
+        ''',
+        f'''
+        INSERT INTO articles_fts (rowid, title, description, tags)
+        SELECT id, title, description, {tags_text_sql('tags')} FROM articles
+        ''',
+        # 无内容表删除时需要提供写入时的值，触发器用 old 中的值重新计算
+        f'''
+        CREATE TRIGGER articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, description, tags)
+            VALUES (new.id, new.title, new.description, {tags_text_sql('new.tags')});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, description, tags)
+            VALUES ('delete', old.id, old.title, old.description, {tags_text_sql('old.tags')});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER articles_fts_update AFTER UPDATE OF id, title, description, tags ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, description, tags)
+            VALUES ('delete', old.id, old.title, old.description, {tags_text_sql('old.tags')});
+            INSERT INTO articles_fts (rowid, title, description, tags)
+            VALUES (new.id, new.title, new.description, {tags_text_sql('new.tags')});
+        END
+        ''',
+    ]),
+    (5, '标签表和文章数统计', [
+        '''
+        CREATE TABLE tags (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            article_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE article_tags (
+            article_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY (article_id, tag_id),
+            FOREIGN KEY (article_id) REFERENCES articles (id),
+            FOREIGN KEY (tag_id) REFERENCES tags (id)
+        ) WITHOUT ROWID
+        ''',
+        # 按标签列出文章：WHERE tag_id = ? ORDER BY article_id DESC
+        'CREATE INDEX idx_article_tags_tag ON article_tags (tag_id, article_id)',
+        # 热门标签：ORDER BY article_count DESC
+        'CREATE INDEX idx_tags_count ON tags (article_count)',
+        # 从 articles.tags 中的 JSON 回填，再一次性统计文章数
+        f'''
+        INSERT INTO tags (name)
+        SELECT DISTINCT j.value FROM articles a, {_json_each_sql('a.tags')} j
+        WHERE j.type = 'text' AND j.value <> ''
+        ''',
+        f'''
+        INSERT INTO article_tags (article_id, tag_id)
+        SELECT DISTINCT a.id, t.id FROM articles a, {_json_each_sql('a.tags')} j JOIN tags t ON t.name = j.value
+        ''',
+        'UPDATE tags SET article_count = (SELECT COUNT(*) FROM article_tags WHERE tag_id = tags.id)',
+        # 文章数随关联增减
+        '''
+        CREATE TRIGGER article_tags_count_insert AFTER INSERT ON article_tags BEGIN
+            UPDATE tags SET article_count = article_count + 1 WHERE id = new.tag_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER article_tags_count_delete AFTER DELETE ON article_tags BEGIN
+            UPDATE tags SET article_count = article_count - 1 WHERE id = old.tag_id;
+        END
+        ''',
+        # 关联随 articles.tags 同步
+        f'''
+        CREATE TRIGGER articles_tags_insert AFTER INSERT ON articles BEGIN
+            {_link_tags_sql('new.id', 'new.tags')}
+        END
+        ''',
+        '''
+        CREATE TRIGGER articles_tags_delete AFTER DELETE ON articles BEGIN
+            DELETE FROM article_tags WHERE article_id = old.id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER articles_tags_update AFTER UPDATE OF id, tags ON articles
+        WHEN old.id IS NOT new.id OR old.tags IS NOT new.tags BEGIN
+            DELETE FROM article_tags WHERE article_id = old.id;
+            {_link_tags_sql('new.id', 'new.tags')}
+        END
+        ''',
+    ]),
+    (6, '随机浏览索引', [
+        # 全部文章和每个分类各有一个从 0 开始、没有空缺的序号，
+        # 随机取一篇只需要在 [0, MAX] 中取随机数再按序号查找，不再 ORDER BY RANDOM() 排序全表
+        '''
+        CREATE TABLE random_index (
+            article_id INTEGER PRIMARY KEY,
+            category TEXT,
+            seq INTEGER NOT NULL,
+            category_seq INTEGER NOT NULL,
+            FOREIGN KEY (article_id) REFERENCES articles (id)
+        )
+        ''',
+        'CREATE UNIQUE INDEX idx_random_seq ON random_index (seq)',
+        'CREATE UNIQUE INDEX idx_random_category_seq ON random_index (category, category_seq)',
+        # 回填时打乱顺序，导出时也会重新打乱（见 export.py）
+        '''
+        INSERT INTO random_index (article_id, category, seq, category_seq)
+        SELECT id, category,
+               ROW_NUMBER() OVER (ORDER BY random()) - 1,
+               ROW_NUMBER() OVER (PARTITION BY category ORDER BY random()) - 1
+        FROM articles
+        ''',
+        f'''
+        CREATE TRIGGER articles_random_insert AFTER INSERT ON articles BEGIN
+            {_append_random_sql('new')}
+        END
+        ''',
+        '''
+        CREATE TRIGGER articles_random_delete AFTER DELETE ON articles BEGIN
+            DELETE FROM random_index WHERE article_id = old.id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER articles_random_update AFTER UPDATE OF id, category ON articles
+        WHEN old.id IS NOT new.id OR old.category IS NOT new.category BEGIN
+            DELETE FROM random_index WHERE article_id = old.id;
+            {_append_random_sql('new')}
+        END
+        ''',
+        # 删除后把序列末尾的一项移到空出的位置，序号保持连续
+        '''
+        CREATE TRIGGER random_index_fill AFTER DELETE ON random_index BEGIN
+            UPDATE random_index SET seq = old.seq
+            WHERE seq = (SELECT MAX(seq) FROM random_index) AND seq > old.seq;
+            UPDATE random_index SET category_seq = old.category_seq
+            WHERE category IS old.category AND category_seq > old.category_seq
+              AND category_seq = (SELECT MAX(category_seq) FROM random_index WHERE category IS old.category);
+        END
+        ''',
+    ]),
+    (7, '统计表', [
+        # 管理界面轮询的总数、分类文章数和最近爬取记录，由触发器随写入维护，读取时不再 COUNT(*)
+        '''
+        CREATE TABLE stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE category_stats (
+            category TEXT PRIMARY KEY,
+            articles INTEGER NOT NULL DEFAULT 0,
+            last_scrape_date DATE,
+            last_scrape_count INTEGER,
+            last_scrape_at TIMESTAMP
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO stats (name, value) VALUES
+            ('articles', (SELECT COUNT(*) FROM articles)),
+            ('images', (SELECT COUNT(*) FROM image_files))
+        ''',
+        # 没有分类的文章记在空字符串下
+        '''
+        INSERT INTO category_stats (category, articles)
+        SELECT IFNULL(category, ''), COUNT(*) FROM articles GROUP BY 1
+        ''',
+        # SELECT 带 WHERE 子句，后面的 ON CONFLICT 才不会被当作连接条件
+        f'''
+        {_record_scrape_sql("SELECT IFNULL(category, ''), scrape_date, articles_count, created_at FROM scrape_log "
+                            "WHERE id IN (SELECT MAX(id) FROM scrape_log GROUP BY IFNULL(category, ''))")}
+        ''',
+        f'''
+        CREATE TRIGGER articles_stats_insert AFTER INSERT ON articles BEGIN
+            UPDATE stats SET value = value + 1 WHERE name = 'articles';
+            {_count_category_sql('new.category', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER articles_stats_delete AFTER DELETE ON articles BEGIN
+            UPDATE stats SET value = value - 1 WHERE name = 'articles';
+            {_count_category_sql('old.category', -1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER articles_stats_update AFTER UPDATE OF category ON articles
+        WHEN old.category IS NOT new.category BEGIN
+            {_count_category_sql('old.category', -1)}
+            {_count_category_sql('new.category', 1)}
+        END
+        ''',
+        '''
+        CREATE TRIGGER image_files_stats_insert AFTER INSERT ON image_files BEGIN
+            UPDATE stats SET value = value + 1 WHERE name = 'images';
+        END
+        ''',
+        '''
+        CREATE TRIGGER image_files_stats_delete AFTER DELETE ON image_files BEGIN
+            UPDATE stats SET value = value - 1 WHERE name = 'images';
+        END
+        ''',
+        f'''
+        CREATE TRIGGER scrape_log_stats_insert AFTER INSERT ON scrape_log BEGIN
+            {_record_scrape_sql("VALUES (IFNULL(new.category, ''), new.scrape_date, new.articles_count, new.created_at)")}
+        END
+        ''',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """数据库当前的结构版本，未迁移过的数据库为 0"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, verbose: bool = False) -> int:
+    """
+    把数据库升级到最新版本，每个版本在一个事务中执行
+    
+    Returns:
+        升级后的版本号
+    """
+    version = get_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"数据库版本 {version} 高于程序支持的版本 {SCHEMA_VERSION}，请更新程序")
+    
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        
+        # 显式开启事务，DDL 和版本号一起提交或回滚
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 并发打开时可能已被其他连接升级
+            if get_version(conn) >= target:
+                conn.execute('ROLLBACK')
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {target}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        if verbose:
+            print(f"✓ 数据库已升级到版本 {target}: {description}")
+        version = target
+    
+    return version
+
+
+def check_derived_tables(conn: sqlite3.Connection, samples: int = 20) -> List[str]:
+    """
+    核对由触发器维护的派生表（统计、标签、随机浏览索引、全文索引）与 articles、image_files 是否一致，
+    数据库中没有的表不检查；全文索引不能读取内容，只抽查 samples 篇文章标题的前 3 个字
+    
+    Returns:
+        不一致的说明，全部一致时为空列表
+    """
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    problems = []
+    
+    def count(sql: str) -> int:
+        return conn.execute(sql).fetchone()[0]
+    
+    if 'stats' in tables:
+        for name, table in (('articles', 'articles'), ('images', 'image_files')):
+            row = conn.execute('SELECT value FROM stats WHERE name = ?', (name,)).fetchone()
+            expected = count(f'SELECT COUNT(*) FROM {table}')
+            if row is None or row[0] != expected:
+                problems.append(f"stats.{name} 为 {row and row[0]}，实际 {expected}")
+    
+    if 'category_stats' in tables:
+        recorded = dict(conn.execute('SELECT category, articles FROM category_stats WHERE articles <> 0'))
+        actual = dict(conn.execute("SELECT IFNULL(category, ''), COUNT(*) FROM articles GROUP BY 1"))
+        for category in sorted(set(recorded) | set(actual)):
+            if recorded.get(category, 0) != actual.get(category, 0):
+                problems.append(f"category_stats[{category or '(空)'}] 为 {recorded.get(category, 0)}，"
+                                f"实际 {actual.get(category, 0)}")
+    
+    if 'tags' in tables and 'article_tags' in tables:
+        wrong = count('''
+            SELECT COUNT(*) FROM tags
+            WHERE article_count <> (SELECT COUNT(*) FROM article_tags WHERE tag_id = tags.id)
+        ''')
+        if wrong:
+            problems.append(f"tags.article_count 有 {wrong} 个标签与 article_tags 不一致")
+        expected = f'''
+            SELECT DISTINCT a.id, j.value FROM articles a, {_json_each_sql('a.tags')} j
+            WHERE j.type = 'text' AND j.value <> ''
+        '''
+        linked = 'SELECT at.article_id, t.name FROM article_tags at JOIN tags t ON t.id = at.tag_id'
+        missing = count(f'SELECT COUNT(*) FROM ({expected} EXCEPT {linked})')
+        extra = count(f'SELECT COUNT(*) FROM ({linked} EXCEPT {expected})')
+        if missing or extra:
+            problems.append(f"article_tags 缺少 {missing} 个、多出 {extra} 个文章标签")
+    
+    if 'random_index' in tables:
+        missing = count('SELECT COUNT(*) FROM articles WHERE id NOT IN (SELECT article_id FROM random_index)')
+        extra = count('SELECT COUNT(*) FROM random_index WHERE article_id NOT IN (SELECT id FROM articles)')
+        if missing or extra:
+            problems.append(f"random_index 缺少 {missing} 篇、多出 {extra} 篇文章")
+        if count('SELECT COALESCE(MAX(seq) + 1, 0) - COUNT(*) FROM random_index'):
+            problems.append("random_index.seq 不连续")
+        gaps = count('''
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM random_index GROUP BY category HAVING MAX(category_seq) + 1 <> COUNT(*)
+            )
+        ''')
+        if gaps:
+            problems.append(f"random_index.category_seq 有 {gaps} 个分类不连续")
+    
+    if 'articles_fts' in tables:
+        try:
+            rows = conn.execute('''
+                SELECT id, substr(title, 1, 3) FROM articles WHERE length(title) >= 3 ORDER BY random() LIMIT ?
+            ''', (samples,)).fetchall()
+            missing = sum(
+                1 for article_id, text in rows
+                if conn.execute('SELECT 1 FROM articles_fts WHERE articles_fts MATCH ? AND rowid = ?',
+                                ('"' + text.replace('"', '""') + '"', article_id)).fetchone() is None
+            )
+        except sqlite3.Error as e:
+            problems.append(f"articles_fts 无法查询: {e}")
+        else:
+            if missing:
+                problems.append(f"articles_fts 抽查的 {len(rows)} 篇文章中有 {missing} 篇搜索不到")
+    
+    return problems
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='升级数据库结构')
+    parser.add_argument('--db', type=str, default='photo.db', help='数据库路径')
+    args = parser.parse_args()
+    
+    conn = sqlite3.connect(args.db)
+    before = get_version(conn)
+    after = migrate(conn, verbose=True)
+    conn.close()
+    print(f"✓ 数据库结构版本: {before} → {after}" if after != before else f"✓ 数据库已是最新版本 {after}")
@@ -1,130 +1,545 @@
 """SQLite 存储"""
 import sqlite3
 import json
-from typing import List, Dict, Any
+import time
+import queue
+import atexit
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Set, Optional
 from core.storage import Storage
+from core.id_index import IdBitmap
+from core.metrics import registry
+from plugins.sqlite_schema import migrate, split_url
+
+
+# IN 查询每批的参数个数，避免超出 SQLite 参数数量上限
+QUERY_CHUNK = 500
+
+# 按 id 插入或更新文章，避免 REPLACE 的删除重插；内容没有变化的文章不会被改写
+ARTICLE_UPSERT_SQL = '''
+    INSERT INTO articles
+    (id, title, category, thumbnail, description, detail_url, date, tags)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        title = excluded.title,
+        category = excluded.category,
+        thumbnail = excluded.thumbnail,
+        description = excluded.description,
+        detail_url = excluded.detail_url,
+        date = excluded.date,
+        tags = excluded.tags
+    WHERE title IS NOT excluded.title
+        OR category IS NOT excluded.category
+        OR thumbnail IS NOT excluded.thumbnail
+        OR description IS NOT excluded.description
+        OR detail_url IS NOT excluded.detail_url
+        OR date IS NOT excluded.date
+        OR tags IS NOT excluded.tags
+'''
+
+# 写缓冲模式下 save_* 只是入队，实际写入的耗时记在 write_batch 和 write_articles/write_images 中
+STORAGE_SECONDS = registry.histogram('scraper_storage_seconds', 'SQLite 存储操作的耗时，按 operation')
+STORAGE_ROWS = registry.counter('scraper_storage_rows_total', '写入的行数，按 table')
 
 
 class SQLiteStorage(Storage):
     """SQLite 存储实现"""
     
-    def __init__(self, db_path: str = 'photo.db'):
+    def __init__(self, db_path: str = 'photo.db', config: Dict[str, Any] = None):
         self.db_path = db_path
+        self.config = config or {}
+        # 持久连接模式：整个爬取过程复用一个写连接
+        self.persistent = bool(self.config.get('persistent', False))
+        self._conn = None
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        # 已存在文章的 ID 索引，load_known_ids() 后启用
+        self._known_ids: Optional[IdBitmap] = None
+        self._tx_new_ids: List[int] = []
+        # 图片地址前缀 -> ID，首次写入图片时加载
+        self._prefix_ids: Optional[Dict[str, int]] = None
+        # 写缓冲模式：写入先进入队列，由后台线程按数量或时间批量落盘
+        self.write_behind = bool(self.config.get('write_behind', False))
+        self.batch_size = max(1, int(self.config.get('batch_size', 500)))
+        self.flush_interval = float(self.config.get('flush_interval', 2.0))
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_error: Optional[BaseException] = None
     
     @property
     def storage_name(self) -> str:
         return "sqlite"
     
     def initialize(self) -> None:
-        """初始化数据库"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS articles (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                category TEXT,
-                thumbnail TEXT,
-                description TEXT,
-                detail_url TEXT,
-                date TEXT,
-                tags TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER,
-                image_url TEXT NOT NULL,
-                img_order INTEGER,
-                FOREIGN KEY (article_id) REFERENCES articles (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scrape_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                scrape_date DATE,
-                category TEXT,
-                articles_count INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """初始化数据库：创建表或把已有数据库升级到最新结构，使用临时连接，不打开写连接"""
+        conn = self._get_connection(persistent=False)
+        try:
+            # export.py 生成的文件删除了爬虫使用的表，不能继续写入
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'export_info'").fetchone():
+                raise RuntimeError(f"{self.db_path} 是导出的查看器数据库，请使用爬虫的工作数据库")
+            migrate(conn, verbose=True)
+        finally:
+            conn.close()
     
-    def _get_connection(self):
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
+    def _get_connection(self, persistent: Optional[bool] = None):
+        """
+        获取数据库连接
+        
+        持久连接（默认按配置）是爬取时复用的写连接，设置 WAL 等写入参数；
+        其他连接不修改日志模式，close() 恢复的单文件数据库不会再生成 -wal/-shm 文件
+        """
+        persistent = self.persistent if persistent is None else persistent
+        conn = sqlite3.connect(self.db_path, check_same_thread=not persistent)
         conn.row_factory = sqlite3.Row
+        if persistent:
+            conn.execute(f"PRAGMA journal_mode = {self.config.get('journal_mode', 'WAL')}")
+            conn.execute(f"PRAGMA synchronous = {self.config.get('synchronous', 'NORMAL')}")
+            conn.execute(f"PRAGMA cache_size = {int(self.config.get('cache_size', -16000))}")
+            conn.execute('PRAGMA temp_store = MEMORY')
+            conn.execute(f"PRAGMA busy_timeout = {int(self.config.get('busy_timeout', 5000))}")
         return conn
     
+    @contextmanager
+    def transaction(self):
+        """事务范围：范围内的所有写入只提交一次，可嵌套"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._get_connection()
+            conn = self._conn
+            self._tx_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    conn.rollback()
+                    # 回滚的文章不能留在索引中，否则下次会被误跳过
+                    if self._known_ids is not None:
+                        for article_id in self._tx_new_ids:
+                            self._known_ids.discard(article_id)
+                    self._tx_new_ids = []
+                    # 回滚后新插入的前缀不存在了，下次重新加载
+                    self._prefix_ids = None
+                    self._release()
+                raise
+            self._tx_depth -= 1
+            if self._tx_depth == 0:
+                with STORAGE_SECONDS.time(operation='commit'):
+                    conn.commit()
+                self._tx_new_ids = []
+                self._release()
+    
+    @contextmanager
+    def _cursor(self):
+        """获取游标，不在事务范围内时自动提交"""
+        with self.transaction() as conn:
+            yield conn.cursor()
+    
+    @contextmanager
+    def _read_cursor(self):
+        """
+        只读查询的游标：写连接已打开（爬取中）时复用它，能读到事务中还没提交的写入；
+        否则使用临时连接，读取不会重新打开写连接
+        """
+        with self._lock:
+            if self._conn is not None:
+                with self._cursor() as cursor:
+                    yield cursor
+                return
+        conn = self._get_connection(persistent=False)
+        try:
+            yield conn.cursor()
+        finally:
+            conn.close()
+    
+    def _read_only_connection(self) -> sqlite3.Connection:
+        """只读连接（mode=ro）：不使用存储的锁和写连接，也不会修改日志模式"""
+        return sqlite3.connect(Path(self.db_path).resolve().as_uri() + '?mode=ro', uri=True)
+    
+    def _release(self) -> None:
+        """非持久模式下，事务结束即关闭连接"""
+        if not self.persistent:
+            self._conn.close()
+            self._conn = None
+    
+    def close(self) -> None:
+        """落盘缓冲的写入并关闭持久连接，之后的读取使用临时连接，写入时重新打开写连接"""
+        self._stop_writer()
+        with self._lock:
+            if self._conn is None:
+                return
+            conn, self._conn = self._conn, None
+            # 发布的数据库需要是单文件，恢复为回滚日志模式
+            try:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                conn.execute('PRAGMA journal_mode = DELETE')
+            except sqlite3.OperationalError as e:
+                print(f"恢复日志模式失败: {e}")
+            conn.close()
+    
     def save_article(self, article: Dict[str, Any]) -> None:
         """保存文章"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO articles 
-            (id, title, category, thumbnail, description, detail_url, date, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            article['id'],
-            article['title'],
-            article.get('category', ''),
-            article.get('thumbnail', ''),
-            article.get('description', ''),
-            article['detail_url'],
-            article.get('date', ''),
-            json.dumps(article.get('tags', []))
-        ))
+        self.save_articles([article])
+    
+    def save_articles(self, articles: List[Dict[str, Any]]) -> None:
+        """批量保存文章"""
+        if not articles:
+            return
+        if self.write_behind:
+            new_ids = self._track_new_ids(article['id'] for article in articles)
+            self._enqueue('articles', list(articles), new_ids)
+            return
         
-        conn.commit()
-        conn.close()
+        with self._cursor() as cursor:
+            self._write_articles(cursor, articles)
+            self._tx_new_ids.extend(self._track_new_ids(article['id'] for article in articles))
     
     def save_images(self, article_id: int, images: List[str]) -> None:
         """保存图片"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        self.save_images_bulk({article_id: images})
+    
+    def save_images_bulk(self, images: Dict[int, List[str]]) -> None:
+        """批量保存图片，参数为 {文章ID: 图片列表}"""
+        if not images:
+            return
+        if self.write_behind:
+            self._enqueue('images', dict(images))
+            return
         
-        cursor.execute('DELETE FROM images WHERE article_id = ?', (article_id,))
+        with self._cursor() as cursor:
+            self._write_images(cursor, images)
+    
+    @STORAGE_SECONDS.time(operation='write_articles')
+    def _write_articles(self, cursor, articles: Iterable[Dict[str, Any]]) -> None:
+        """执行文章写入"""
+        articles = list(articles)
+        STORAGE_ROWS.inc(len(articles), table='articles')
+        cursor.executemany(ARTICLE_UPSERT_SQL, [
+            (
+                article['id'],
+                article['title'],
+                article.get('category', ''),
+                article.get('thumbnail', ''),
+                article.get('description', ''),
+                article['detail_url'],
+                article.get('date', ''),
+                json.dumps(article.get('tags', []))
+            )
+            for article in articles
+        ])
+        # 写入后的文章不再需要恢复
+        cursor.executemany('DELETE FROM crawl_pending WHERE article_id = ?',
+                           [(article['id'],) for article in articles])
+    
+    @STORAGE_SECONDS.time(operation='write_images')
+    def _write_images(self, cursor, images: Dict[int, List[str]]) -> None:
+        """执行图片写入：与已保存的列表比较，只写入有变化的行"""
+        stored = self._stored_images(cursor, list(images))
         
-        for idx, url in enumerate(images):
-            cursor.execute('''
-                INSERT INTO images (article_id, image_url, img_order)
-                VALUES (?, ?, ?)
-            ''', (article_id, url, idx))
+        updates, inserts, deletes = [], [], []
+        for article_id, urls in images.items():
+            rows = stored.get(article_id, {})
+            for idx, url in enumerate(urls):
+                row = rows.pop(idx, None)
+                if row is None:
+                    inserts.append((article_id, url, idx))
+                elif row[1] != url:
+                    updates.append((url, row[0]))
+            # 新列表中没有的位置
+            deletes.extend((row[0],) for row in rows.values())
         
-        conn.commit()
-        conn.close()
+        STORAGE_ROWS.inc(len(inserts) + len(updates), table='images')
+        if deletes:
+            cursor.executemany('DELETE FROM image_files WHERE id = ?', deletes)
+        if updates:
+            cursor.executemany('UPDATE image_files SET prefix_id = ?, suffix = ? WHERE id = ?', [
+                (*self._split_image_url(cursor, url), row_id) for url, row_id in updates
+            ])
+        if inserts:
+            cursor.executemany('''
+                INSERT INTO image_files (article_id, prefix_id, suffix, img_order)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (article_id, *self._split_image_url(cursor, url), idx)
+                for article_id, url, idx in inserts
+            ])
+    
+    def _split_image_url(self, cursor, url: str) -> tuple:
+        """把图片地址拆成 (前缀ID, 文件名)，新前缀写入 url_prefixes"""
+        if self._prefix_ids is None:
+            cursor.execute('SELECT prefix, id FROM url_prefixes')
+            self._prefix_ids = dict(cursor.fetchall())
+        prefix, suffix = split_url(url)
+        prefix_id = self._prefix_ids.get(prefix)
+        if prefix_id is None:
+            cursor.execute('INSERT INTO url_prefixes (prefix) VALUES (?)', (prefix,))
+            prefix_id = self._prefix_ids[prefix] = cursor.lastrowid
+        return prefix_id, suffix
+    
+    def _stored_images(self, cursor, article_ids: List[int]) -> Dict[int, Dict[int, tuple]]:
+        """读取已保存的图片，返回 {文章ID: {序号: (行ID, 图片URL)}}"""
+        stored: Dict[int, Dict[int, tuple]] = {}
+        duplicates = []
+        for start in range(0, len(article_ids), QUERY_CHUNK):
+            chunk = article_ids[start:start + QUERY_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT id, article_id, img_order, image_url FROM images
+                WHERE article_id IN ({placeholders}) ORDER BY id
+            ''', chunk)
+            for row_id, article_id, img_order, image_url in cursor.fetchall():
+                rows = stored.setdefault(article_id, {})
+                if img_order in rows:
+                    # 旧数据中同一序号的重复行
+                    duplicates.append((row_id,))
+                else:
+                    rows[img_order] = (row_id, image_url)
+        if duplicates:
+            cursor.executemany('DELETE FROM image_files WHERE id = ?', duplicates)
+        return stored
+    
+    def _track_new_ids(self, article_ids: Iterable[int]) -> List[int]:
+        """把新文章 ID 加入索引，返回本次新增的 ID；并发的分类线程和后台写入线程的回滚共用索引，需要加锁"""
+        with self._lock:
+            if self._known_ids is None:
+                return []
+            new_ids = [article_id for article_id in article_ids if article_id not in self._known_ids]
+            self._known_ids.update(new_ids)
+            return new_ids
+    
+    def _enqueue(self, kind: str, payload: Any, new_ids: List[int] = None) -> None:
+        """把写入放入缓冲队列"""
+        self._raise_writer_error()
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop,
+                                                name='sqlite-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self._stop_writer)
+        self._queue.put((kind, payload, new_ids or []))
+    
+    def flush(self) -> None:
+        """等待缓冲中的写入全部落盘"""
+        if self._writer is not None:
+            done = threading.Event()
+            self._queue.put(('flush', done, None))
+            done.wait()
+        self._raise_writer_error()
+    
+    def _stop_writer(self) -> None:
+        """落盘缓冲并停止后台写线程"""
+        writer = self._writer
+        if writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(('stop', done, None))
+        done.wait()
+        writer.join()
+        self._writer = None
+        atexit.unregister(self._stop_writer)
+        self._raise_writer_error()
+    
+    def _raise_writer_error(self) -> None:
+        """抛出后台写线程中发生的错误"""
+        if self._writer_error is not None:
+            error, self._writer_error = self._writer_error, None
+            raise error
+    
+    def _writer_loop(self) -> None:
+        """后台写线程：缓冲达到数量或时间阈值时，在一个事务中批量写入"""
+        batch = []
+        rows = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, payload, new_ids = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind = 'timeout'
+            
+            if kind in ('articles', 'images'):
+                batch.append((kind, payload, new_ids))
+                rows += len(payload) if kind == 'articles' else sum(len(urls) for urls in payload.values())
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if rows < self.batch_size:
+                    continue
+            
+            if batch:
+                self._write_batch(batch)
+                batch, rows, deadline = [], 0, None
+            
+            if kind in ('flush', 'stop'):
+                payload.set()
+            if kind == 'stop':
+                return
+    
+    @STORAGE_SECONDS.time(operation='write_batch')
+    def _write_batch(self, batch: List[tuple]) -> None:
+        """把一批缓冲写入在一个事务中执行"""
+        articles: Dict[int, Dict[str, Any]] = {}
+        images: Dict[int, List[str]] = {}
+        new_ids: List[int] = []
+        for kind, payload, ids in batch:
+            if kind == 'articles':
+                # 同一篇文章多次写入只保留最后一次
+                for article in payload:
+                    articles[article['id']] = article
+            else:
+                images.update(payload)
+            new_ids.extend(ids)
+        
+        try:
+            with self.transaction() as conn:
+                self._tx_new_ids.extend(new_ids)
+                cursor = conn.cursor()
+                self._write_articles(cursor, articles.values())
+                self._write_images(cursor, images)
+        except Exception as e:
+            print(f"批量写入失败: {e}")
+            self._writer_error = e
     
     def article_exists(self, article_id: int) -> bool:
         """检查文章是否存在"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        if self._known_ids is not None:
+            return article_id in self._known_ids
         
-        cursor.execute('SELECT id FROM articles WHERE id = ?', (article_id,))
-        result = cursor.fetchone()
-        conn.close()
+        with self._read_cursor() as cursor:
+            cursor.execute('SELECT id FROM articles WHERE id = ?', (article_id,))
+            result = cursor.fetchone()
         
         return result is not None
     
+    @STORAGE_SECONDS.time(operation='existing_ids')
+    def existing_ids(self, article_ids: Iterable[int]) -> Set[int]:
+        """批量检查文章是否存在，返回已存在的 ID"""
+        article_ids = list(article_ids)
+        if self._known_ids is not None:
+            return {article_id for article_id in article_ids if article_id in self._known_ids}
+        
+        found = set()
+        with self._read_cursor() as cursor:
+            # 分批查询
+            for start in range(0, len(article_ids), QUERY_CHUNK):
+                chunk = article_ids[start:start + QUERY_CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f'SELECT id FROM articles WHERE id IN ({placeholders})', chunk)
+                found.update(row[0] for row in cursor.fetchall())
+        return found
+    
+    @STORAGE_SECONDS.time(operation='load_known_ids')
+    def load_known_ids(self) -> None:
+        """从数据库加载已存在的文章 ID 索引，之后的写入会同步更新索引"""
+        with self._read_cursor() as cursor:
+            cursor.execute('SELECT id FROM articles')
+            self._known_ids = IdBitmap(row[0] for row in cursor)
+    
+    def get_high_water_mark(self, category: str) -> Optional[int]:
+        """获取分类已爬取的最大文章 ID"""
+        with self._read_cursor() as cursor:
+            cursor.execute('SELECT high_water_id FROM crawl_state WHERE category = ?', (category or '',))
+            row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def set_high_water_mark(self, category: str, article_id: int) -> None:
+        """记录分类已爬取的最大文章 ID，只会增大"""
+        with self._cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO crawl_state (category, high_water_id) VALUES (?, ?)
+                ON CONFLICT(category) DO UPDATE SET
+                    high_water_id = MAX(high_water_id, excluded.high_water_id),
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (category or '', article_id))
+    
+    def get_crawl_progress(self, category: str) -> Optional[Dict[str, Any]]:
+        """获取分类的爬取进度"""
+        with self._read_cursor() as cursor:
+            cursor.execute('SELECT next_page, max_seen_id, status FROM crawl_progress WHERE category = ?',
+                           (category or '',))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute('SELECT article FROM crawl_pending WHERE category = ? ORDER BY article_id DESC',
+                           (category or '',))
+            pending = [json.loads(article) for (article,) in cursor]
+        return {'next_page': row[0], 'max_seen_id': row[1], 'status': row[2], 'pending': pending}
+    
+    @STORAGE_SECONDS.time(operation='save_crawl_progress')
+    def save_crawl_progress(self, category: str, next_page: Optional[int], max_seen_id: Optional[int],
+                            pending: List[Dict[str, Any]]) -> None:
+        """记录分类的爬取进度，直接提交，不经过后台写入"""
+        with self._cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO crawl_progress (category, next_page, max_seen_id, status) VALUES (?, ?, ?, 'running')
+                ON CONFLICT(category) DO UPDATE SET
+                    next_page = excluded.next_page,
+                    max_seen_id = excluded.max_seen_id,
+                    status = 'running',
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (category or '', next_page, max_seen_id))
+            cursor.executemany(
+                'INSERT OR REPLACE INTO crawl_pending (article_id, category, article) VALUES (?, ?, ?)',
+                [(article['id'], category or '', json.dumps(article, ensure_ascii=False)) for article in pending]
+            )
+    
+    def finish_crawl_progress(self, category: str) -> None:
+        """标记分类已爬取完成"""
+        with self._cursor() as cursor:
+            cursor.execute('''
+                UPDATE crawl_progress SET next_page = NULL, status = 'done', updated_at = CURRENT_TIMESTAMP
+                WHERE category = ?
+            ''', (category or '',))
+            cursor.execute('DELETE FROM crawl_pending WHERE category = ?', (category or '',))
+    
+    def clear_crawl_progress(self, category: str) -> None:
+        """清除分类的爬取进度"""
+        with self._cursor() as cursor:
+            cursor.execute('DELETE FROM crawl_progress WHERE category = ?', (category or '',))
+            cursor.execute('DELETE FROM crawl_pending WHERE category = ?', (category or '',))
+    
+    @STORAGE_SECONDS.time(operation='get_stats')
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取数据库统计：总数和分类统计读取触发器维护的统计表，不扫描文章和图片
+        
+        界面会定时调用，使用单独的只读连接，不等待后台写入线程持有的锁，只能看到已提交的写入
+        """
+        conn = self._read_only_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, value FROM stats')
+            totals = dict(cursor.fetchall())
+            cursor.execute('''
+                SELECT category, articles, last_scrape_date, last_scrape_count, last_scrape_at
+                FROM category_stats ORDER BY category
+            ''')
+            categories = cursor.fetchall()
+            # scrape_log 按主键倒序取最后几行，不需要统计表
+            cursor.execute('SELECT scrape_date, category, articles_count FROM scrape_log ORDER BY id DESC LIMIT 10')
+            recent_logs = [{'date': row[0], 'category': row[1], 'count': row[2]} for row in cursor.fetchall()]
+        finally:
+            conn.close()
+        
+        return {
+            'total_articles': totals.get('articles', 0),
+            'total_images': totals.get('images', 0),
+            'category_stats': {row[0]: row[1] for row in categories if row[1] > 0},
+            'last_scrapes': {
+                row[0]: {'date': row[2], 'count': row[3], 'time': row[4]}
+                for row in categories if row[4] is not None
+            },
+            'recent_logs': recent_logs
+        }
+    
     def log_scrape(self, category: str, count: int) -> None:
         """记录爬取日志"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
         from datetime import datetime
         today = datetime.now().strftime('%Y-%m-%d')
         
-        cursor.execute('''
-            INSERT INTO scrape_log (scrape_date, category, articles_count)
-            VALUES (?, ?, ?)
-        ''', (today, category, count))
-        
-        conn.commit()
-        conn.close()
+        with self._cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO scrape_log (scrape_date, category, articles_count)
+                VALUES (?, ?, ?)
+            ''', (today, category, count))
@@ -1,22 +1,65 @@
 """Web 爬虫数据源"""
 import requests
-from bs4 import BeautifulSoup
-import re
+from requests.adapters import HTTPAdapter
 import time
 import random
-from urllib.parse import urljoin
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
 from typing import List, Dict, Any, Optional
 from core.data_source import DataSource
+from core.metrics import registry
+from core.rate_limiter import RateLimiter
+from plugins.http_cache import HttpCache
+from plugins.html_extract import parse_article_list, parse_article_detail
+from plugins.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+
+
+# 获取：网络耗时只计 session.get，总耗时另含限速等待、并发槽位等待和重试间隔
+HTTP_REQUESTS = registry.counter('scraper_http_requests_total', 'HTTP 请求次数（每次尝试），按状态码，网络错误为 error')
+HTTP_SECONDS = registry.histogram('scraper_http_request_seconds', '单次 HTTP 请求的网络耗时')
+HTTP_RETRIES = registry.counter('scraper_http_retries_total', 'HTTP 请求失败后的重试次数')
+FETCH_SECONDS = registry.histogram('scraper_fetch_seconds', '获取一个地址的总耗时，result 为 ok 或 failed')
+RATE_LIMIT_WAIT = registry.histogram('scraper_rate_limit_wait_seconds', '等待限速器和主机并发槽位的耗时')
+CACHE_LOOKUPS = registry.counter('scraper_cache_lookups_total', '响应缓存查找结果：fresh、revalidated、miss、stale')
+# 解析：page 为 list 或 detail，使用进程池时包含进程间传输
+PARSE_SECONDS = registry.histogram('scraper_parse_seconds', '解析页面的耗时')
+PARSED_ARTICLES = registry.counter('scraper_parsed_articles_total', '从列表页解析出的文章数')
 
 
 class WebScraperDataSource(DataSource):
     """Web 爬虫数据源"""
     
-    def __init__(self, base_url: str, config: Dict[str, Any] = None):
+    def __init__(self, base_url: str, config: Dict[str, Any] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         self.base_url = base_url
         self.config = config or {}
         self.session = requests.Session()
+        # 限速器由所有并发请求共享
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(self.config.get('rate_limit', {}))
+        # 同一主机的最大并发请求数
+        self.max_per_host = max(1, int(self.config.get('max_per_host', 4)))
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        adapter = HTTPAdapter(pool_maxsize=max(10, self.max_per_host))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self._update_headers()
+        
+        # 页面解析引擎：lxml（默认）或 bs4
+        self.parser = self.config.get('parser', 'lxml')
+        
+        # 解析进程数，0 表示在调用线程中解析；大于 0 时 HTML 发送到进程池解析，
+        # 只有提取出的文章、标签和图片地址返回主进程
+        self.parse_processes = max(0, int(self.config.get('parse_processes', 0)))
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._parse_pool_lock = threading.Lock()
+        
+        # 可选的响应缓存
+        cache_config = self.config.get('cache')
+        self.cache = HttpCache(cache_config['path'], cache_config) if cache_config else None
     
     @property
     def source_name(self) -> str:
@@ -36,24 +79,137 @@ class WebScraperDataSource(DataSource):
             'Referer': self.base_url
         })
     
-    def _request_with_retry(self, url: str, max_retries: int = 3) -> Optional[requests.Response]:
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取主机的并发槽位"""
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+            return slot
+    
+    def _request_with_retry(self, url: str, max_retries: int = 3,
+                            headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
         """带重试的请求"""
+        fetch_start = time.monotonic()
         for attempt in range(max_retries):
+            retry_after = None
             try:
-                time.sleep(random.uniform(0.5, 1.5))
-                response = self.session.get(url, timeout=15)
+                wait_start = time.monotonic()
+                with self._host_slot(url):
+                    self.rate_limiter.acquire(url)
+                    start = time.monotonic()
+                    RATE_LIMIT_WAIT.observe(start - wait_start)
+                    try:
+                        response = self.session.get(url, timeout=15, headers=headers)
+                    except requests.RequestException:
+                        latency = time.monotonic() - start
+                        self.rate_limiter.record(url, latency)
+                        HTTP_SECONDS.observe(latency)
+                        HTTP_REQUESTS.inc(status='error')
+                        raise
+                    latency = time.monotonic() - start
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    self.rate_limiter.record(url, latency, response.status_code, retry_after)
+                    HTTP_SECONDS.observe(latency)
+                    HTTP_REQUESTS.inc(status=response.status_code)
                 response.raise_for_status()
                 response.encoding = 'utf-8'
+                FETCH_SECONDS.observe(time.monotonic() - fetch_start, result='ok')
                 return response
             except Exception as e:
                 if attempt < max_retries - 1:
-                    time.sleep(random.uniform(2, 4))
+                    HTTP_RETRIES.inc()
+                    time.sleep(max(self.rate_limiter.backoff(attempt), retry_after or 0))
                     self._update_headers()
                 else:
                     print(f"请求失败: {url}, {e}")
+                    FETCH_SECONDS.observe(time.monotonic() - fetch_start, result='failed')
                     return None
         return None
     
+    def _fetch_text(self, url: str) -> Optional[str]:
+        """获取页面内容，启用缓存时优先使用缓存并发送条件请求"""
+        if self.cache is None:
+            response = self._request_with_retry(url)
+            return response.text if response else None
+        
+        entry = self.cache.get(url)
+        if entry and self.cache.is_fresh(entry):
+            CACHE_LOOKUPS.inc(result='fresh')
+            return entry.body
+        
+        response = self._request_with_retry(url, headers=entry.validators() if entry else None)
+        if response is None:
+            # 请求失败时使用过期的缓存
+            if entry:
+                CACHE_LOOKUPS.inc(result='stale')
+            return entry.body if entry else None
+        
+        if response.status_code == 304 and entry:
+            CACHE_LOOKUPS.inc(result='revalidated')
+            # 服务器可能在 304 中返回新的校验信息，下次条件请求使用新的值
+            self.cache.touch(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return entry.body
+        
+        CACHE_LOOKUPS.inc(result='miss')
+        self.cache.put(url, response.text,
+                       response.headers.get('ETag'),
+                       response.headers.get('Last-Modified'))
+        return response.text
+    
+    def _get_parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        """获取解析进程池，首次使用时创建"""
+        if not self.parse_processes:
+            return None
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # spawn 避免在多线程进程中 fork，Windows 上也是同样的行为
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._parse_pool
+    
+    def _shutdown_parse_pool(self) -> None:
+        """关闭解析进程池"""
+        with self._parse_pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _run_parser(self, func, html: str):
+        """执行解析函数，配置了解析进程时在进程池中执行"""
+        pool = self._get_parse_pool()
+        if pool is None:
+            return func(html, self.base_url, self.parser)
+        try:
+            return pool.submit(func, html, self.base_url, self.parser).result()
+        except BrokenProcessPool as e:
+            print(f"解析进程池异常，改为在当前进程中解析: {e}")
+            self.parse_processes = 0
+            self._shutdown_parse_pool()
+            return func(html, self.base_url, self.parser)
+    
+    def _parse_list(self, html: str):
+        """解析列表页"""
+        with PARSE_SECONDS.time(page='list'):
+            articles, has_next = self._run_parser(parse_article_list, html)
+        PARSED_ARTICLES.inc(len(articles))
+        return articles, has_next
+    
+    def _parse_detail(self, html: str) -> Dict[str, Any]:
+        """解析详情页"""
+        with PARSE_SECONDS.time(page='detail'):
+            return self._run_parser(parse_article_detail, html)
+    
+    def close(self) -> None:
+        """关闭数据源"""
+        if self.cache:
+            self.cache.close()
+        self._shutdown_parse_pool()
+    
     def get_categories(self) -> List[Dict[str, Any]]:
         """获取分类列表"""
         return [
@@ -71,88 +227,32 @@ class WebScraperDataSource(DataSource):
         else:
             url = f'{self.base_url}/Articles?Page={page}'
         
-        response = self._request_with_retry(url)
-        if not response:
+        html = self._fetch_text(url)
+        if not html:
             return [], False
         
-        soup = BeautifulSoup(response.text, 'lxml')
-        articles = []
-        items = soup.select('.index-imgs')
-        
-        for item in items:
-            try:
-                link = item.select_one('a.index-imgcontent-img')
-                title_link = item.select_one('a.index-imgcontent-title')
-                img = item.select_one('img.lazyimg')
-                
-                if not link or not title_link:
-                    continue
-                
-                detail_url = link.get('href', '')
-                title = title_link.get('title', '').strip()
-                thumbnail = img.get('data-original', '') if img else ''
-                description = link.get('title', '').strip()
-                
-                match = re.search(r'/Content/(\d+)\.html', detail_url)
-                if match:
-                    article_id = int(match.group(1))
-                    articles.append({
-                        'id': article_id,
-                        'title': title,
-                        'thumbnail': urljoin(self.base_url, thumbnail),
-                        'description': description,
-                        'detail_url': urljoin(self.base_url, detail_url),
-                        'category': self._get_category_name(category)
-                    })
-            except Exception as e:
-                print(f"解析文章项出错: {e}")
-                continue
-        
-        has_next = bool(soup.select('li a[aria-label="Next"]'))
+        articles, has_next = self._parse_list(html)
+        category_name = self._get_category_name(category)
+        for article in articles:
+            article['category'] = category_name
         return articles, has_next
     
     def get_article_detail(self, article_id: int, detail_url: str) -> Optional[Dict[str, Any]]:
         """获取文章详情"""
-        response = self._request_with_retry(detail_url)
-        if not response:
+        return self.parse_article_detail(article_id, self.fetch_article_detail(article_id, detail_url))
+    
+    def fetch_article_detail(self, article_id: int, detail_url: str) -> Optional[str]:
+        """获取详情页 HTML"""
+        return self._fetch_text(detail_url)
+    
+    def parse_article_detail(self, article_id: int, html: Optional[str]) -> Optional[Dict[str, Any]]:
+        """解析详情页 HTML"""
+        if not html:
             return None
         
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        title_elem = soup.select_one('h1.content-title')
-        title = title_elem.get_text(strip=True) if title_elem else ''
-        
-        tags = []
-        tag_links = soup.select('.text-primary a[href*="/Articles/Tags"]')
-        for tag_link in tag_links:
-            tag = tag_link.get_text(strip=True)
-            if tag:
-                tags.append(tag)
-        
-        date = ''
-        date_elem = soup.select_one('.text-primary')
-        if date_elem:
-            date_text = date_elem.get_text()
-            date_match = re.search(r'日期：(\d{4}-\d{2}-\d{2})', date_text)
-            if date_match:
-                date = date_match.group(1)
-        
-        images = []
-        raw_content = soup.select_one('#rawContent')
-        if raw_content:
-            img_tags = raw_content.select('img')
-            for img in img_tags:
-                img_url = img.get('src', '')
-                if img_url:
-                    images.append(urljoin(self.base_url, img_url))
-        
-        return {
-            'id': article_id,
-            'title': title,
-            'tags': tags,
-            'date': date,
-            'images': images
-        }
+        detail = self._parse_detail(html)
+        detail['id'] = article_id
+        return detail
     
     def test_connection(self) -> bool:
         """测试连接"""
@@ -3,7 +3,13 @@ from core.data_source import DataSourceManager
 from core.storage import StorageManager
 from plugins.web_scraper import WebScraperDataSource
 from plugins.sqlite_storage import SQLiteStorage
-from typing import Optional, Callable
+from core.pipeline import CrawlPipeline, saved_event
+from core.metrics import registry
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+from typing import Optional, Callable, List, Dict, Any
 
 
 class PhotoScraper:
@@ -12,6 +18,30 @@ class PhotoScraper:
     def __init__(self, config: dict = None):
         self.config = config or {}
         
+        # 并发获取详情的线程数，1 表示串行
+        self.detail_workers = max(1, int(self.config.get('detail_workers', 1)))
+        
+        # 处理引擎：serial 逐页处理，pipeline 分阶段流水线
+        self.engine = self.config.get('engine', 'serial')
+        self.pipeline_config = dict(self.config.get('pipeline', {}))
+        self.pipeline_config.setdefault('fetch_workers', self.detail_workers)
+        # 每个解析进程配一个解析线程，保证进程池始终有任务
+        self.pipeline_config.setdefault(
+            'parse_workers', max(1, int(self.config.get('scraper', {}).get('parse_processes', 0)))
+        )
+        
+        # 停止标记，由 stop() 设置
+        self._stop_event = threading.Event()
+        
+        # 结构化进度事件的监听者，见 add_listener()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        
+        # 同时爬取的分类数，1 表示逐个分类爬取
+        self.category_workers = max(1, int(self.config.get('category_workers', 1)))
+        
+        # 增量模式下，连续多少页全是已知文章时停止翻页
+        self.known_pages_to_stop = max(1, int(self.config.get('known_pages_to_stop', 1)))
+        
         # 初始化数据源管理器
         self.data_source_manager = DataSourceManager()
         
@@ -27,15 +57,64 @@ class PhotoScraper:
         
         # 注册存储
         sqlite_storage = SQLiteStorage(
-            db_path=self.config.get('db_path', 'photo.db')
+            db_path=self.config.get('db_path', 'photo.db'),
+            config=self.config.get('storage', {})
         )
         self.storage_manager.register_storage(sqlite_storage)
     
+    @property
+    def stop_requested(self) -> bool:
+        """是否已请求停止"""
+        return self._stop_event.is_set()
+    
+    def stop(self) -> None:
+        """请求停止爬取，当前页已获取的数据会写入后再退出"""
+        self._stop_event.set()
+    
+    def close(self) -> None:
+        """关闭爬虫：落盘缓冲的写入、释放连接和缓存并重置停止标记"""
+        self.storage_manager.close()
+        self.data_source_manager.close()
+        self._stop_event.clear()
+    
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        添加进度监听者，爬取过程中以事件字典调用（并发爬取时可能来自多个线程）
+        
+        事件都有 type、time 和 category，另外：
+            category_start: 开始爬取分类
+            page: 列出一个列表页，page 页码、articles 本页文章数、pending 需要处理的文章数
+            saved: 一批文章已提交，articles 文章数、images 图片数、last_article 最后一篇的 id 和 title
+                   （流水线引擎另有 queues 各阶段的队列长度）
+            category_done: 分类结束，count 爬取的文章数、stopped 是否因停止请求结束
+        """
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """移除进度监听者"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, event_type: str, **data) -> None:
+        """通知所有监听者，监听者出错不影响爬取"""
+        event = {'type': event_type, 'time': time.time(), **data}
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"进度监听出错: {e}")
+    
+    def get_stats(self) -> Optional[Dict[str, Any]]:
+        """获取数据库统计，读取的是触发器维护的统计表，可以频繁调用"""
+        return self.storage_manager.get_active_storage().get_stats()
+    
     def scrape_category(self, 
                        category_id: str, 
                        max_pages: Optional[int] = None,
                        skip_existing: bool = True,
-                       progress_callback: Optional[Callable[[str], None]] = None) -> int:
+                       progress_callback: Optional[Callable[[str], None]] = None,
+                       incremental: bool = False,
+                       resume: bool = False) -> int:
         """
         爬取指定分类
         
@@ -44,20 +123,94 @@ class PhotoScraper:
             max_pages: 最大页数，None表示全部
             skip_existing: 是否跳过已存在的文章
             progress_callback: 进度回调函数
+            incremental: 增量模式，遇到连续的已知页面后停止翻页
+            resume: 从上次中断的位置继续：先处理未写入的文章，再从下一个列表页翻页
         
         Returns:
             爬取的文章数量
         """
+        if skip_existing or incremental:
+            self.storage_manager.get_active_storage().load_known_ids()
+        
+        return self._scrape_category(category_id, max_pages, skip_existing,
+                                     progress_callback, incremental, resume)
+    
+    def _scrape_category(self, category_id: str, max_pages: Optional[int], skip_existing: bool,
+                         progress_callback: Optional[Callable[[str], None]],
+                         incremental: bool, resume: bool) -> int:
+        """爬取指定分类，已存在文章的索引由调用方加载"""
         source = self.data_source_manager.get_active_source()
         storage = self.storage_manager.get_active_storage()
         
+        progress = None
+        if resume:
+            progress = storage.get_crawl_progress(category_id)
+            if progress is None:
+                print(f"分类 {category_id} 没有可恢复的进度，从第 1 页开始")
+            elif progress['status'] == 'done':
+                print(f"分类 {category_id} 上次已爬取完成，没有需要恢复的进度")
+                return 0
+        else:
+            storage.clear_crawl_progress(category_id)
+        
+        crawl = {'max_seen_id': progress['max_seen_id'] if progress else None}
+        self._emit('category_start', category=category_id)
+        pages = self._iter_pages(source, storage, category_id, max_pages, skip_existing,
+                                 incremental, progress_callback, crawl, progress)
+        
+        if self.engine == 'pipeline':
+            total_count = self._run_pipeline(source, storage, pages, category_id, progress_callback)
+        else:
+            total_count = self._run_serial(source, storage, pages, category_id)
+        
+        # 等待缓冲的写入落盘，再记录日志
+        storage.flush()
+        if not self.stop_requested:
+            # 中途停止时保留进度，下次可以 resume
+            storage.finish_crawl_progress(category_id)
+            if crawl['max_seen_id'] is not None:
+                storage.set_high_water_mark(category_id, crawl['max_seen_id'])
+        storage.log_scrape(category_id, total_count)
+        self._emit('category_done', category=category_id, count=total_count, stopped=self.stop_requested)
+        
+        return total_count
+    
+    def _iter_pages(self, source, storage, category_id: str, max_pages: Optional[int],
+                    skip_existing: bool, incremental: bool,
+                    progress_callback: Optional[Callable[[str], None]], crawl: Dict[str, Any],
+                    progress: Optional[Dict[str, Any]] = None):
+        """
+        逐页获取文章列表，生成 (文章列表, 需要处理的 [(序号, 文章)])
+        
+        翻页的停止条件（最大页数、停止请求、增量模式的已知页面、没有下一页）都在这里判断，
+        本页看到的最大文章 ID 记入 crawl['max_seen_id']。每页在处理前记录进度，
+        传入上次的进度时先生成未写入的文章，再从记录的下一页继续
+        """
         page = 1
-        total_count = 0
+        
+        if progress:
+            if progress['pending']:
+                print(f"恢复上次未完成的 {len(progress['pending'])} 篇文章")
+                articles = progress['pending']
+                existing = storage.existing_ids(a['id'] for a in articles) if skip_existing else set()
+                yield articles, [(idx, a) for idx, a in enumerate(articles, 1) if a['id'] not in existing]
+            if progress['next_page'] is None:
+                return
+            page = progress['next_page']
+            print(f"从第 {page} 页继续爬取")
+        
+        # 增量模式：已爬取的最大文章 ID 及连续的已知页数
+        high_water = storage.get_high_water_mark(category_id) if incremental else None
+        known_pages = 0
         
         while True:
             if max_pages and page > max_pages:
                 break
             
+            if self.stop_requested:
+                print("收到停止请求，停止爬取")
+                break
+            
             if progress_callback:
                 progress_callback(f"正在爬取第 {page} 页...")
             
@@ -69,48 +222,121 @@ class PhotoScraper:
                 print("没有获取到文章，停止爬取")
                 break
             
+            # 整页一次性检查是否已存在
+            existing = storage.existing_ids(a['id'] for a in articles) if skip_existing or incremental else set()
+            
+            page_max_id = max(article['id'] for article in articles)
+            max_seen_id = crawl['max_seen_id']
+            crawl['max_seen_id'] = page_max_id if max_seen_id is None else max(max_seen_id, page_max_id)
+            
+            if incremental:
+                page_known = all(
+                    article['id'] in existing or (high_water is not None and article['id'] <= high_water)
+                    for article in articles
+                )
+                known_pages = known_pages + 1 if page_known else 0
+            
+            pending = []
             for idx, article in enumerate(articles, 1):
-                # 检查是否已存在
-                if skip_existing and storage.article_exists(article['id']):
+                if skip_existing and article['id'] in existing:
                     print(f"  [{idx}/{len(articles)}] 文章 {article['id']} 已存在，跳过")
                     continue
-                
-                print(f"  [{idx}/{len(articles)}] 处理文章 {article['id']}: {article['title']}")
-                
-                # 保存文章基本信息
-                storage.save_article(article)
-                
-                # 获取详情
-                detail = source.get_article_detail(article['id'], article['detail_url'])
-                if detail and detail.get('images'):
-                    storage.save_images(article['id'], detail['images'])
-                    
-                    # 更新文章信息
-                    article.update({
-                        'tags': detail.get('tags', []),
-                        'date': detail.get('date', '')
-                    })
-                    storage.save_article(article)
-                    
-                    print(f"      保存了 {len(detail['images'])} 张图片")
-                
-                total_count += 1
+                pending.append((idx, article))
+            
+            storage.save_crawl_progress(category_id, page + 1 if has_next else None,
+                                        crawl['max_seen_id'], [article for _, article in pending])
+            self._emit('page', category=category_id, page=page, articles=len(articles), pending=len(pending))
+            
+            yield articles, pending
+            
+            if incremental and known_pages >= self.known_pages_to_stop:
+                print(f"连续 {known_pages} 页均为已知文章，停止增量爬取")
+                break
             
             if not has_next:
                 print("没有下一页，停止爬取")
                 break
             
             page += 1
+    
+    def _run_serial(self, source, storage, pages, category_id: str) -> int:
+        """逐页处理：获取详情（可并发）后整页写入，再获取下一页"""
+        total_count = 0
         
-        # 记录日志
-        storage.log_scrape(category_id, total_count)
+        executor = None
+        if self.detail_workers > 1:
+            executor = ThreadPoolExecutor(max_workers=self.detail_workers,
+                                          thread_name_prefix='detail')
         
+        try:
+            for articles, pending in pages:
+                # 获取详情（结果顺序与 pending 一致）
+                details = self._fetch_details(source, [article for _, article in pending], executor)
+                
+                rows = []
+                images = {}
+                for (idx, article), detail in zip(pending, details):
+                    if self.stop_requested:
+                        break
+                    
+                    print(f"  [{idx}/{len(articles)}] 处理文章 {article['id']}: {article['title']}")
+                    
+                    if detail and detail.get('images'):
+                        images[article['id']] = detail['images']
+                        
+                        # 合并详情信息，文章只写入一次
+                        article.update({
+                            'tags': detail.get('tags', []),
+                            'date': detail.get('date', '')
+                        })
+                        
+                        print(f"      保存了 {len(detail['images'])} 张图片")
+                    
+                    rows.append(article)
+                    total_count += 1
+                
+                # 整页的写入在一个事务中提交
+                with storage.transaction():
+                    storage.save_articles(rows)
+                    storage.save_images_bulk(images)
+                if rows:
+                    self._emit('saved', category=category_id, **saved_event(rows, images))
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+        
+        return total_count
+    
+    def _run_pipeline(self, source, storage, pages, category_id: str,
+                      progress_callback: Optional[Callable[[str], None]] = None) -> int:
+        """流水线处理：翻页、获取详情、解析、写入在各自的线程中同时进行"""
+        pipeline = CrawlPipeline(source, storage, self.pipeline_config,
+                                 stop_event=self._stop_event,
+                                 progress_callback=progress_callback,
+                                 event_callback=lambda event_type, data: self._emit(
+                                     event_type, category=category_id, **data))
+        articles = (article for _, pending in pages for _, article in pending)
+        total_count = pipeline.run(articles)
+        if pipeline.dropped:
+            print(f"停止时丢弃了 {pipeline.dropped} 篇尚未获取详情的文章")
         return total_count
     
+    def _fetch_details(self, source, articles: List[Dict[str, Any]],
+                       executor: Optional[ThreadPoolExecutor] = None):
+        """获取一批文章的详情，按输入顺序返回"""
+        def fetch(article):
+            return source.get_article_detail(article['id'], article['detail_url'])
+        
+        if executor is None:
+            return map(fetch, articles)
+        return executor.map(fetch, articles)
+    
     def scrape_all_categories(self, 
                              max_pages_per_category: Optional[int] = None,
                              skip_existing: bool = True,
-                             progress_callback: Optional[Callable[[str], None]] = None) -> dict:
+                             progress_callback: Optional[Callable[[str], None]] = None,
+                             incremental: bool = False,
+                             resume: bool = False) -> dict:
         """
         爬取所有分类
         
@@ -123,9 +349,21 @@ class PhotoScraper:
         # 排除"最新"分类
         real_categories = [cat for cat in categories if cat['id'] != '']
         
-        stats = {}
+        # 已存在文章的索引只加载一次，之后随写入更新，并发的分类共用
+        if skip_existing or incremental:
+            self.storage_manager.get_active_storage().load_known_ids()
+        
+        # 不恢复时先清除所有分类的进度：上次中断时还没轮到的分类可能留着更早一次的完成记录，
+        # 这次再中断后 --resume 会把它们当作已完成而跳过
+        if not resume:
+            storage = self.storage_manager.get_active_storage()
+            for cat in real_categories:
+                storage.clear_crawl_progress(cat['id'])
         
-        for cat in real_categories:
+        def crawl(cat):
+            if self.stop_requested:
+                return None
+            
             if progress_callback:
                 progress_callback(f"开始爬取分类: {cat['name']}")
             
@@ -133,15 +371,30 @@ class PhotoScraper:
             print(f"开始爬取分类: {cat['name']} (ID: {cat['id']})")
             print(f"{'='*60}")
             
-            count = self.scrape_category(
-                cat['id'],
-                max_pages=max_pages_per_category,
-                skip_existing=skip_existing,
-                progress_callback=progress_callback
-            )
+            count = self._scrape_category(cat['id'], max_pages_per_category, skip_existing,
+                                          progress_callback, incremental, resume)
             
-            stats[cat['name']] = count
             print(f"\n分类 {cat['name']} 完成，共爬取 {count} 篇文章")
+            return count
+        
+        if self.category_workers > 1:
+            # 分类并发爬取；数据源只有一个，限速器和单主机并发上限由所有分类共享
+            with ThreadPoolExecutor(max_workers=max(1, min(self.category_workers, len(real_categories))),
+                                    thread_name_prefix='category') as executor:
+                counts = list(executor.map(crawl, real_categories))
+        else:
+            counts = []
+            for cat in real_categories:
+                count = crawl(cat)
+                if count is None:
+                    break
+                counts.append(count)
+        
+        # 统计按分类顺序返回，与完成顺序无关
+        stats = {}
+        for cat, count in zip(real_categories, counts):
+            if count is not None:
+                stats[cat['name']] = count
         
         return stats
 
@@ -155,6 +408,24 @@ def main():
     parser.add_argument('--max-pages', type=int, help='每个分类最大页数')
     parser.add_argument('--db', type=str, default='photo.db', help='数据库路径')
     parser.add_argument('--no-skip', action='store_true', help='不跳过已存在的文章')
+    parser.add_argument('--incremental', action='store_true', help='增量爬取，遇到已知页面后停止翻页')
+    parser.add_argument('--resume', action='store_true', help='从上次中断的位置继续爬取')
+    parser.add_argument('--stop-after-known', type=int, default=1, help='增量模式下连续多少页全是已知文章时停止')
+    parser.add_argument('--cache', type=str, help='HTTP 响应缓存文件路径，不指定则不缓存')
+    parser.add_argument('--cache-max-mb', type=int, default=512, help='HTTP 响应缓存大小上限（MB）')
+    parser.add_argument('--rate', type=float, default=1.0, help='每个主机的初始请求速率（次/秒）')
+    parser.add_argument('--max-rate', type=float, default=10.0, help='每个主机的最大请求速率（次/秒）')
+    parser.add_argument('--parser', type=str, default='lxml', choices=['lxml', 'bs4'], help='页面解析引擎')
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='解析页面的进程数，0 表示不使用进程池（可设为 CPU 核数）')
+    parser.add_argument('--workers', type=int, default=1, help='并发获取详情的线程数')
+    parser.add_argument('--engine', type=str, default='serial', choices=['serial', 'pipeline'],
+                        help='处理引擎：serial 逐页处理，pipeline 分阶段流水线')
+    parser.add_argument('--queue-size', type=int, default=100, help='流水线各阶段队列的容量')
+    parser.add_argument('--category-workers', type=int, default=1, help='同时爬取的分类数')
+    parser.add_argument('--max-per-host', type=int, default=4, help='同一主机的最大并发请求数')
+    parser.add_argument('--metrics-json', type=str,
+                        help='结束时把各阶段的计数和耗时摘要写入该 JSON 文件，- 表示输出到终端')
     
     args = parser.parse_args()
     
@@ -169,7 +440,21 @@ def main():
     config = {
         'base_url': 'https://www.tuao.cc',
         'db_path': db_path,
+        'detail_workers': args.workers,
+        'category_workers': args.category_workers,
+        'engine': args.engine,
+        'pipeline': {'queue_size': args.queue_size},
+        'known_pages_to_stop': args.stop_after_known,
+        'storage': {
+            'persistent': True,
+            'write_behind': True
+        },
         'scraper': {
+            'max_per_host': args.max_per_host,
+            'parser': args.parser,
+            'parse_processes': args.parse_processes,
+            'cache': {'path': args.cache, 'max_mb': args.cache_max_mb} if args.cache else None,
+            'rate_limit': {'rate': args.rate, 'max_rate': args.max_rate},
             'user_agents': [
                 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -184,20 +469,44 @@ def main():
     print("照片爬虫启动")
     print("=" * 60)
     
-    # 开始爬取
+    try:
+        run(scraper, args)
+    finally:
+        scraper.close()
+        if args.metrics_json:
+            write_metrics_summary(args.metrics_json)
+
+
+def write_metrics_summary(path: str) -> None:
+    """写出本次运行的指标摘要"""
+    text = json.dumps(registry.summary(), ensure_ascii=False, indent=2)
+    if path == '-':
+        print(text)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    print(f"✓ 指标摘要已写入 {path}")
+
+
+def run(scraper: PhotoScraper, args) -> None:
+    """按命令行参数执行爬取"""
     if args.category:
         # 爬取指定分类
         count = scraper.scrape_category(
             args.category,
             max_pages=args.max_pages,
-            skip_existing=not args.no_skip
+            skip_existing=not args.no_skip,
+            incremental=args.incremental,
+            resume=args.resume
         )
         print(f"\n完成！共爬取 {count} 篇文章")
     else:
         # 爬取所有分类
         stats = scraper.scrape_all_categories(
             max_pages_per_category=args.max_pages,
-            skip_existing=not args.no_skip
+            skip_existing=not args.no_skip,
+            incremental=args.incremental,
+            resume=args.resume
         )
         
         print("\n" + "=" * 60)
@@ -0,0 +1,365 @@
+"""端到端爬取性能测试 - 在本地模拟站点上运行爬虫，统计吞吐量、各阶段延迟和内存峰值"""
+import os
+import io
+import re
+import sys
+import json
+import math
+import time
+import zlib
+import random
+import sqlite3
+import tempfile
+import contextlib
+import multiprocessing
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows 没有 resource 模块，改用 psutil
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - 两者都没有时不统计内存峰值
+    psutil = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper import PhotoScraper
+from tools.sample_pages import list_page_html, detail_page_html
+
+
+LIST_PATH_RE = re.compile(r'^/Articles(?:/Categories/(\d+))?$')
+DETAIL_PATH_RE = re.compile(r'^/Articles/Content/(\d+)\.html$')
+PAGE_RE = re.compile(r'Page=(\d+)')
+
+
+class StandInSite:
+    """模拟站点：生成与目标网站结构一致的列表页和详情页，可回放录制的页面"""
+    
+    def __init__(self, articles_per_category: int = 200, per_page: int = 40,
+                 images_per_article: int = 20, recorded: Dict[str, str] = None):
+        self.per_page = per_page
+        self.images_per_article = images_per_article
+        self.recorded = recorded or {}
+        
+        # 文章 ID 连续递增，按顺序轮流分配到 4 个分类，列表页按 ID 倒序
+        self.categories: Dict[str, List[int]] = {str(cid): [] for cid in range(1, 5)}
+        for idx in range(articles_per_category * 4):
+            self.categories[str(idx % 4 + 1)].append(100000 + idx)
+        self.categories[''] = sorted((aid for ids in self.categories.values() for aid in ids), reverse=True)
+        for ids in self.categories.values():
+            ids.sort(reverse=True)
+    
+    def render(self, path: str, query: str) -> Optional[str]:
+        """返回页面 HTML，不存在时返回 None"""
+        recorded = self.recorded.get(f'{path}?{query}' if query else path)
+        if recorded is not None:
+            return recorded
+        
+        match = LIST_PATH_RE.match(path)
+        if match:
+            ids = self.categories.get(match.group(1) or '')
+            if ids is None:
+                return None
+            page_match = PAGE_RE.search(query)
+            page = int(page_match.group(1)) if page_match else 1
+            start = (page - 1) * self.per_page
+            page_ids = ids[start:start + self.per_page]
+            return list_page_html(page_ids, has_next=start + self.per_page < len(ids), page=page)
+        
+        match = DETAIL_PATH_RE.match(path)
+        if match:
+            return detail_page_html(int(match.group(1)), self.images_per_article)
+        return None
+
+
+def load_recorded(cache_path: str) -> Dict[str, str]:
+    """从 HTTP 响应缓存（爬虫 --cache 生成）加载录制的页面，按路径和查询串索引"""
+    recorded = {}
+    conn = sqlite3.connect(cache_path)
+    for url, body in conn.execute('SELECT url, body FROM responses'):
+        parsed = urlparse(url)
+        key = f'{parsed.path}?{parsed.query}' if parsed.query else parsed.path
+        recorded[key] = zlib.decompress(body).decode('utf-8')
+    conn.close()
+    return recorded
+
+
+def serve_site(site: StandInSite, latency: float, jitter: float, error_rate: float,
+               counters, ready) -> None:
+    """在独立进程中运行模拟站点，避免与爬虫争用 GIL"""
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, *args):
+            pass
+        
+        def do_GET(self):
+            with counters['requests'].get_lock():
+                counters['requests'].value += 1
+            
+            delay = latency + random.uniform(-jitter, jitter)
+            if delay > 0:
+                time.sleep(delay)
+            
+            if error_rate and random.random() < error_rate:
+                with counters['errors'].get_lock():
+                    counters['errors'].value += 1
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            
+            parsed = urlparse(self.path)
+            html = site.render(parsed.path, parsed.query)
+            body = (html if html is not None else '<html><body>Not Found</body></html>').encode('utf-8')
+            self.send_response(200 if html is not None else 404)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 256
+        daemon_threads = True
+    
+    server = Server(('127.0.0.1', 0), Handler)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class StageTimer:
+    """记录各阶段每次调用的耗时"""
+    
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._restore = []
+    
+    def wrap(self, owner, attr: str, stage: str) -> None:
+        """替换 owner 的方法，调用结束后记录耗时；restore() 时还原"""
+        original = getattr(owner, attr)
+        samples = self.samples.setdefault(stage, [])
+        
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        
+        had_own = attr in vars(owner)
+        self._restore.append((owner, attr, original if had_own else None))
+        setattr(owner, attr, timed)
+    
+    def restore(self) -> None:
+        """还原被替换的方法"""
+        for owner, attr, original in reversed(self._restore):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+        self._restore = []
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的调用次数、总耗时和 p50/p99（毫秒）"""
+        result = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            result[stage] = {
+                'count': len(ordered),
+                'total_s': sum(ordered),
+                'p50_ms': percentile(ordered, 50) * 1000,
+                'p99_ms': percentile(ordered, 99) * 1000,
+            }
+        return result
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """已排序样本的百分位数（最近秩）"""
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """
+    当前进程的内存峰值（MB），无法统计时为 None
+    
+    children 为 True 时统计已结束的子进程（--parse-processes 的解析进程）中峰值最大的一个，
+    只有 resource 模块可用（Linux、macOS）时支持
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    if psutil is not None and not children:
+        # Windows 的 peak_wset 是工作集峰值，其他平台只能取当前值
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024 / 1024
+    return None
+
+
+def format_mb(value: Optional[float]) -> str:
+    """内存大小的显示文本"""
+    return f"{value:.1f} MB" if value is not None else "n/a"
+
+
+def instrument(scraper: PhotoScraper, timer: StageTimer) -> None:
+    """给爬虫各阶段加上计时"""
+    source = scraper.data_source_manager.get_active_source()
+    storage = scraper.storage_manager.get_active_storage()
+    timer.wrap(source, '_request_with_retry', 'request')
+    timer.wrap(source, 'get_articles', 'list_page')
+    timer.wrap(source, 'fetch_article_detail', 'fetch_detail')
+    timer.wrap(source, '_parse_list', 'parse_list')
+    timer.wrap(source, '_parse_detail', 'parse_detail')
+    timer.wrap(storage, '_write_articles', 'write_articles')
+    timer.wrap(storage, '_write_images', 'write_images')
+
+
+def run_benchmark(base_url: str, db_path: str, args, counters) -> Dict[str, Any]:
+    """运行一次爬取并汇总结果"""
+    config = {
+        'base_url': base_url,
+        'db_path': db_path,
+        'detail_workers': args.workers,
+        'category_workers': args.category_workers,
+        'engine': args.engine,
+        'pipeline': {'queue_size': args.queue_size},
+        'storage': {
+            'persistent': True,
+            'write_behind': not args.no_write_behind
+        },
+        'scraper': {
+            'max_per_host': args.max_per_host,
+            'parser': args.parser,
+            'parse_processes': args.parse_processes,
+            'rate_limit': {'rate': args.rate, 'max_rate': args.max_rate, 'burst': args.max_per_host},
+        }
+    }
+    scraper = PhotoScraper(config)
+    timer = StageTimer()
+    instrument(scraper, timer)
+    
+    output = io.StringIO() if not args.verbose else sys.stdout
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            try:
+                if args.category is not None:
+                    articles = scraper.scrape_category(args.category, max_pages=args.max_pages)
+                else:
+                    articles = sum(scraper.scrape_all_categories(max_pages_per_category=args.max_pages).values())
+            finally:
+                # 包含等待后台写入落盘的时间
+                scraper.close()
+    finally:
+        timer.restore()
+    elapsed = time.perf_counter() - start
+    
+    conn = sqlite3.connect(db_path)
+    images = conn.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+    conn.close()
+    
+    return {
+        'elapsed_s': elapsed,
+        'articles': articles,
+        'images': images,
+        'requests': counters['requests'].value,
+        'server_errors': counters['errors'].value,
+        'articles_per_sec': articles / elapsed if elapsed else 0.0,
+        'requests_per_sec': counters['requests'].value / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        # 解析进程池已随 close() 结束，可以统计
+        'children_peak_rss_mb': peak_rss_mb(children=True) if args.parse_processes else None,
+        'stages': timer.summary(),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    """打印测试结果"""
+    print(f"\n耗时: {result['elapsed_s']:.2f} 秒")
+    print(f"文章: {result['articles']} 篇  图片: {result['images']} 张")
+    print(f"请求: {result['requests']} 次（注入错误 {result['server_errors']} 次）")
+    print(f"吞吐量: {result['articles_per_sec']:.1f} 篇/秒  {result['requests_per_sec']:.1f} 请求/秒")
+    print(f"内存峰值: {format_mb(result['peak_rss_mb'])}（不含子进程）")
+    if result['children_peak_rss_mb'] is not None:
+        print(f"解析进程内存峰值: {format_mb(result['children_peak_rss_mb'])}（最大的一个）")
+    
+    print("\n各阶段耗时:")
+    print(f"  {'阶段':<16}{'次数':>8}{'总计(秒)':>12}{'p50(毫秒)':>12}{'p99(毫秒)':>12}")
+    for stage, stats in result['stages'].items():
+        print(f"  {stage:<18}{stats['count']:>8}{stats['total_s']:>12.2f}"
+              f"{stats['p50_ms']:>12.2f}{stats['p99_ms']:>12.2f}")
+
+
+def main():
+    """主函数"""
+    import argparse
+    parser = argparse.ArgumentParser(description='端到端爬取性能测试（本地模拟站点）')
+    parser.add_argument('--category', type=str, help='只爬取指定分类（1-4，空字符串为最新），不指定则爬取所有分类')
+    parser.add_argument('--max-pages', type=int, help='每个分类最大页数')
+    parser.add_argument('--articles', type=int, default=200, help='模拟站点每个分类的文章数')
+    parser.add_argument('--per-page', type=int, default=40, help='模拟站点列表页每页文章数')
+    parser.add_argument('--images', type=int, default=20, help='模拟站点每篇文章的图片数')
+    parser.add_argument('--recorded', type=str, help='回放 HTTP 响应缓存中录制的页面，没有录制的页面使用生成的页面')
+    parser.add_argument('--latency', type=float, default=50, help='模拟站点响应延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=20, help='响应延迟的随机抖动（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 503 的请求比例（0-1）')
+    parser.add_argument('--workers', type=int, default=4, help='并发获取详情的线程数')
+    parser.add_argument('--category-workers', type=int, default=1, help='同时爬取的分类数')
+    parser.add_argument('--engine', type=str, default='serial', choices=['serial', 'pipeline'], help='处理引擎')
+    parser.add_argument('--queue-size', type=int, default=100, help='流水线各阶段队列的容量')
+    parser.add_argument('--max-per-host', type=int, default=4, help='同一主机的最大并发请求数')
+    parser.add_argument('--rate', type=float, default=1000.0, help='初始请求速率（次/秒），默认相当于不限速')
+    parser.add_argument('--max-rate', type=float, default=1000.0, help='最大请求速率（次/秒）')
+    parser.add_argument('--parser', type=str, default='lxml', choices=['lxml', 'bs4'], help='页面解析引擎')
+    parser.add_argument('--parse-processes', type=int, default=0, help='解析页面的进程数，0 表示不使用进程池')
+    parser.add_argument('--no-write-behind', action='store_true', help='关闭后台批量写入')
+    parser.add_argument('--json', type=str, help='把结果写入 JSON 文件，便于对比回归')
+    parser.add_argument('--verbose', action='store_true', help='显示爬虫的输出')
+    args = parser.parse_args()
+    
+    recorded = load_recorded(args.recorded) if args.recorded else None
+    site = StandInSite(args.articles, args.per_page, args.images, recorded)
+    counters = {'requests': multiprocessing.Value('i', 0), 'errors': multiprocessing.Value('i', 0)}
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve_site,
+        args=(site, args.latency / 1000, args.jitter / 1000, args.error_rate, counters, ready),
+        daemon=True
+    )
+    server.start()
+    base_url = f'http://127.0.0.1:{ready.get(timeout=10)}'
+    
+    print("=" * 60)
+    print(f"端到端爬取性能测试: {base_url}")
+    print(f"  延迟 {args.latency:.0f}±{args.jitter:.0f} 毫秒, 错误率 {args.error_rate:.0%}, "
+          f"引擎 {args.engine}, 分类并发 {args.category_workers}, 详情线程 {args.workers}, 单主机并发 {args.max_per_host}, 解析引擎 {args.parser}")
+    print("=" * 60)
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run_benchmark(base_url, os.path.join(tmp, 'bench.db'), args, counters)
+    finally:
+        server.terminate()
+        server.join()
+    
+    result['settings'] = vars(args)
+    print_report(result)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已写入 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""页面解析性能测试 - 比较各解析引擎的吞吐量，并校验输出一致"""
+import os
+import sys
+import glob
+import time
+import zlib
+import sqlite3
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugins.html_extract import ENGINES, parse_article_list, parse_article_detail
+from tools.sample_pages import list_page_html, detail_page_html
+
+
+BASE_URL = 'https://www.tuao.cc'
+
+
+def load_pages(pages_dir: str = None, cache_path: str = None) -> List[Tuple[str, str]]:
+    """
+    加载页面，返回 [(类型, HTML)]，类型为 list 或 detail
+    
+    优先使用保存的页面目录或 HTTP 响应缓存，都没有时生成样例页面
+    """
+    htmls = []
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+            with open(path, encoding='utf-8') as f:
+                htmls.append(f.read())
+    if cache_path:
+        conn = sqlite3.connect(cache_path)
+        for (body,) in conn.execute('SELECT body FROM responses'):
+            htmls.append(zlib.decompress(body).decode('utf-8'))
+        conn.close()
+    if not htmls:
+        htmls = [list_page_html(range(1000 + page * 40, 1040 + page * 40), page=page) for page in range(20)]
+        htmls += [detail_page_html(article_id) for article_id in range(1000, 1080)]
+    
+    return [('list' if 'index-imgs' in html else 'detail', html) for html in htmls]
+
+
+def parse(kind: str, html: str, engine: str):
+    """按页面类型解析"""
+    if kind == 'list':
+        return parse_article_list(html, BASE_URL, engine)
+    return parse_article_detail(html, BASE_URL, engine)
+
+
+def check_equivalence(pages: List[Tuple[str, str]]) -> int:
+    """校验各引擎输出一致，返回不一致的页面数"""
+    mismatches = 0
+    for idx, (kind, html) in enumerate(pages):
+        results = {engine: parse(kind, html, engine) for engine in ENGINES}
+        expected = results[ENGINES[-1]]
+        for engine, result in results.items():
+            if result != expected:
+                mismatches += 1
+                print(f"  ✗ 第 {idx} 个页面（{kind}）: {engine} 与 {ENGINES[-1]} 的输出不一致")
+                break
+    return mismatches
+
+
+def benchmark(pages: List[Tuple[str, str]], rounds: int = 3) -> dict:
+    """测量各引擎的解析吞吐量（页/秒）"""
+    results = {}
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    for engine in ENGINES:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for kind, html in pages:
+                parse(kind, html, engine)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[engine] = {
+            'pages_per_sec': len(pages) / best,
+            'mb_per_sec': total_bytes / best / 1024 / 1024,
+        }
+    return results
+
+
+def main():
+    """主函数"""
+    import argparse
+    parser = argparse.ArgumentParser(description='页面解析性能测试')
+    parser.add_argument('--pages', type=str, help='保存的 HTML 页面目录')
+    parser.add_argument('--cache', type=str, help='HTTP 响应缓存文件（爬虫 --cache 生成）')
+    parser.add_argument('--rounds', type=int, default=3, help='每个引擎的测试轮数，取最快一轮')
+    args = parser.parse_args()
+    
+    pages = load_pages(args.pages, args.cache)
+    list_count = sum(1 for kind, _ in pages if kind == 'list')
+    print("=" * 60)
+    print(f"页面解析性能测试: {list_count} 个列表页, {len(pages) - list_count} 个详情页")
+    print("=" * 60)
+    
+    print("\n输出一致性校验:")
+    mismatches = check_equivalence(pages)
+    if mismatches:
+        print(f"  ✗ {mismatches} 个页面不一致")
+    else:
+        print(f"  ✓ 所有引擎输出一致")
+    
+    print("\n解析吞吐量:")
+    results = benchmark(pages, args.rounds)
+    baseline = results['bs4']['pages_per_sec']
+    for engine, stats in results.items():
+        print(f"  {engine:6s} {stats['pages_per_sec']:8.1f} 页/秒  {stats['mb_per_sec']:6.2f} MB/秒  "
+              f"({stats['pages_per_sec'] / baseline:.1f}x)")
+    
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""样例页面 - 生成与目标网站结构一致的列表页和详情页 HTML"""
+import random
+from typing import List, Optional
+
+
+CATEGORY_NAMES = {'1': '无圣光', '2': '凸凹图', '3': '靓人体', '4': '写真集'}
+
+
+def _page_shell(title: str, body: str) -> str:
+    """页面框架：导航、侧边栏、脚本等与提取无关的内容"""
+    nav = ''.join(
+        f'<li class="nav-item"><a class="nav-link" href="/Articles/Categories/{cid}">{name}</a></li>'
+        for cid, name in CATEGORY_NAMES.items()
+    )
+    hot_tags = ''.join(
+        f'<a class="badge badge-light" href="/Articles/Tags/{i}">热门标签{i}</a>' for i in range(40)
+    )
+    return f'''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="/css/site.css">
+<script>var _hmt = _hmt || []; window.dataLayer = [];</script>
+</head>
+<body>
+<!-- 顶部导航 -->
+<nav class="navbar navbar-expand-lg"><ul class="navbar-nav">{nav}</ul></nav>
+<div class="container"><div class="row">
+<div class="col-md-9">{body}</div>
+<div class="col-md-3 sidebar"><div class="card"><div class="card-body">{hot_tags}</div></div></div>
+</div></div>
+<footer class="footer"><p>&copy; 2024 示例站点</p></footer>
+<script src="/js/jquery.min.js"></script>
+<script>$(function () {{ $('img.lazyimg').lazyload(); }});</script>
+</body>
+</html>'''
+
+
+def list_page_html(article_ids: List[int], has_next: bool = True, page: int = 1) -> str:
+    """生成列表页"""
+    items = []
+    for article_id in article_ids:
+        items.append(f'''
+<div class="col-6 col-md-3 index-imgs">
+  <div class="index-imgcontent">
+    <a class="index-imgcontent-img" href="/Articles/Content/{article_id}.html" title="文章{article_id}的描述 &amp; 简介" target="_blank">
+      <img class="lazyimg img-fluid" src="/img/loading.gif" data-original="/Files/images/thumb/{article_id}.jpg" alt="">
+    </a>
+    <a class="index-imgcontent-title" href="/Articles/Content/{article_id}.html" title=" 文章标题 {article_id} ">文章标题 {article_id}</a>
+  </div>
+</div>''')
+
+    pager = [f'<li class="page-item"><a class="page-link" href="?Page={p}">{p}</a></li>'
+             for p in range(max(1, page - 3), page + 4)]
+    if has_next:
+        pager.append(f'<li class="page-item"><a class="page-link" aria-label="Next" href="?Page={page + 1}">&raquo;</a></li>')
+    body = f'<div class="row">{"".join(items)}</div><ul class="pagination">{"".join(pager)}</ul>'
+    return _page_shell(f'列表 第{page}页', body)
+
+
+def detail_page_html(article_id: int, image_count: int = 20, tags: Optional[List[str]] = None,
+                     date: Optional[str] = None) -> str:
+    """生成详情页"""
+    rng = random.Random(article_id)
+    tags = tags if tags is not None else [f'标签{rng.randint(1, 300)}' for _ in range(rng.randint(2, 6))]
+    date = date or f'20{rng.randint(18, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+    tag_links = ' '.join(f'<a href="/Articles/Tags/{tag}">{tag}</a>' for tag in tags)
+    images = ''.join(
+        f'<p><img src="/Files/images/2024{rng.randint(1, 12):02d}/{article_id}_{idx:03d}.webp" alt=""></p>'
+        for idx in range(image_count)
+    )
+    body = f'''
+<h1 class="content-title"> 文章标题 <small>{article_id}</small> </h1>
+<div class="text-primary">日期：{date} &nbsp; 标签：{tag_links}<!-- 浏览次数 --></div>
+<div class="text-primary">作者：示例</div>
+<div class="content" id="rawContent">{images}<script>/* 广告 */</script></div>
+<div class="related">{''.join(f'<a href="/Articles/Content/{article_id - i}.html">相关{i}</a>' for i in range(1, 9))}</div>'''
+    return _page_shell(f'文章 {article_id}', body)
@@ -1,9 +1,12 @@
 """爬虫 Web 管理界面"""
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from flask_cors import CORS
 from scraper import PhotoScraper
+from core.metrics import registry
+import json
+import time
+import queue
 import threading
-import sqlite3
 from datetime import datetime
 
 
@@ -20,9 +23,59 @@ scrape_status = {
     'current_category': '',
     'current_page': 0,
     'total_articles': 0,
+    'total_images': 0,
+    'pages': 0,
+    'started_at': None,
+    'articles_per_minute': 0.0,
+    'images_per_second': 0.0,
+    'last_article': None,
     'should_stop': False
 }
 
+# 进度事件可能来自多个爬取线程
+_status_lock = threading.Lock()
+
+# 数据库统计的缓存时间（秒）：多个页面同时查看时，每个周期最多读取一次数据库
+STATS_TTL = 2.0
+_stats_cache = {'time': 0.0, 'stats': None}
+_stats_lock = threading.Lock()
+
+
+class EventBroadcaster:
+    """把事件分发给每个 /api/events 连接各自的队列，连接处理不过来时丢弃最旧的事件"""
+    
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._subscribers = []
+        self._lock = threading.Lock()
+    
+    def subscribe(self) -> queue.Queue:
+        """新连接订阅事件"""
+        subscriber = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        """连接断开后取消订阅"""
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+    
+    def publish(self, event_type: str, data) -> None:
+        """发布事件，不等待任何连接"""
+        with self._lock:
+            for subscriber in self._subscribers:
+                if subscriber.full():
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+                subscriber.put_nowait((event_type, data))
+
+
+events = EventBroadcaster()
+
 
 def init_scraper(db_path='photo.db'):
     """初始化爬虫"""
@@ -30,6 +83,10 @@ def init_scraper(db_path='photo.db'):
     config = {
         'base_url': 'https://www.tuao.cc',
         'db_path': db_path,
+        'storage': {
+            'persistent': True,
+            'write_behind': True
+        },
         'scraper': {
             'user_agents': [
                 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -40,54 +97,44 @@ def init_scraper(db_path='photo.db'):
     scraper = PhotoScraper(config)
 
 
-def get_db_stats(db_path='photo.db'):
-    """获取数据库统计"""
+def get_db_stats():
+    """获取数据库统计（读取爬虫当前使用的数据库中的统计表）"""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # 总文章数
-        cursor.execute('SELECT COUNT(*) FROM articles')
-        total_articles = cursor.fetchone()[0]
-        
-        # 总图片数
-        cursor.execute('SELECT COUNT(*) FROM images')
-        total_images = cursor.fetchone()[0]
-        
-        # 各分类统计
-        cursor.execute('SELECT category, COUNT(*) FROM articles GROUP BY category')
-        category_stats = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # 最近爬取记录
-        cursor.execute('''
-            SELECT scrape_date, category, articles_count 
-            FROM scrape_log 
-            ORDER BY id DESC 
-            LIMIT 10
-        ''')
-        recent_logs = [
-            {'date': row[0], 'category': row[1], 'count': row[2]}
-            for row in cursor.fetchall()
-        ]
-        
-        conn.close()
-        
-        return {
-            'total_articles': total_articles,
-            'total_images': total_images,
-            'category_stats': category_stats,
-            'recent_logs': recent_logs
-        }
+        stats = scraper.get_stats()
+        if stats is None:
+            raise RuntimeError('存储不提供统计')
+        return stats
     except Exception as e:
         return {
             'total_articles': 0,
             'total_images': 0,
             'category_stats': {},
+            'last_scrapes': {},
             'recent_logs': [],
             'error': str(e)
         }
 
 
+def get_cached_db_stats():
+    """获取数据库统计，STATS_TTL 内重复调用返回缓存"""
+    with _stats_lock:
+        now = time.monotonic()
+        if _stats_cache['stats'] is None or now - _stats_cache['time'] >= STATS_TTL:
+            _stats_cache['stats'] = get_db_stats()
+            _stats_cache['time'] = now
+        return _stats_cache['stats']
+
+
+def publish_status():
+    """把当前爬取状态推送给所有连接"""
+    events.publish('status', dict(scrape_status))
+
+
+def format_sse(event_type, data):
+    """编码为一条 Server-Sent Events 消息"""
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @app.route('/')
 def index():
     """主页"""
@@ -97,7 +144,7 @@ def index():
 @app.route('/api/status')
 def get_status():
     """获取爬取状态"""
-    stats = get_db_stats()
+    stats = get_cached_db_stats()
     return jsonify({
         'success': True,
         'scrape_status': scrape_status,
@@ -105,6 +152,47 @@ def get_status():
     })
 
 
+@app.route('/api/events')
+def stream_events():
+    """
+    推送爬取状态（Server-Sent Events），代替轮询 /api/status
+    
+    连接后先发送 status 和 stats，之后爬虫的进度事件以 progress 推送（包含事件和最新状态），
+    开始、停止和结束时推送 status，数据库统计有变化时推送 stats
+    """
+    def generate():
+        subscriber = events.subscribe()
+        try:
+            yield format_sse('status', dict(scrape_status))
+            last_stats = None
+            while True:
+                # 统计来自共享缓存，连接数不影响数据库读取次数
+                stats = get_cached_db_stats()
+                if stats != last_stats:
+                    last_stats = stats
+                    yield format_sse('stats', stats)
+                try:
+                    event_type, data = subscriber.get(timeout=STATS_TTL)
+                except queue.Empty:
+                    # 注释行保持连接，也让断开的连接及时结束
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event_type, data)
+        finally:
+            events.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/metrics')
+def get_metrics():
+    """获取、解析、存储各阶段的计数和耗时，Prometheus 文本格式"""
+    return Response(registry.to_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/start', methods=['POST'])
 def start_scrape():
     """开始爬取"""
@@ -120,6 +208,8 @@ def start_scrape():
     category = data.get('category', '')  # 空表示所有分类
     max_pages = data.get('max_pages', 5)
     skip_existing = data.get('skip_existing', True)
+    incremental = data.get('incremental', False)
+    resume = data.get('resume', False)
     
     # 重置状态
     scrape_status.update({
@@ -128,13 +218,20 @@ def start_scrape():
         'current_category': '',
         'current_page': 0,
         'total_articles': 0,
+        'total_images': 0,
+        'pages': 0,
+        'started_at': time.time(),
+        'articles_per_minute': 0.0,
+        'images_per_second': 0.0,
+        'last_article': None,
         'should_stop': False
     })
+    publish_status()
     
     # 在后台线程中执行
     thread = threading.Thread(
         target=run_scrape,
-        args=(category, max_pages, skip_existing)
+        args=(category, max_pages, skip_existing, incremental, resume)
     )
     thread.daemon = True
     thread.start()
@@ -158,6 +255,8 @@ def stop_scrape():
     
     scrape_status['should_stop'] = True
     scrape_status['progress'] = '正在停止...'
+    scraper.stop()
+    publish_status()
     
     return jsonify({
         'success': True,
@@ -165,19 +264,43 @@ def stop_scrape():
     })
 
 
-def run_scrape(category, max_pages, skip_existing):
+def on_scrape_event(event):
+    """把爬虫的进度事件汇总到 scrape_status，并推送给所有连接"""
+    with _status_lock:
+        _apply_event(event)
+        snapshot = dict(scrape_status)
+    events.publish('progress', {'event': event, 'status': snapshot})
+
+
+def _apply_event(event):
+    """更新 scrape_status 中的进度、计数和速度"""
+    event_type = event['type']
+    if event_type == 'category_start':
+        scrape_status['current_category'] = event['category']
+    elif event_type == 'page':
+        scrape_status['current_page'] = event['page']
+        scrape_status['pages'] += 1
+    elif event_type == 'saved':
+        scrape_status['total_articles'] += event['articles']
+        scrape_status['total_images'] += event['images']
+        scrape_status['last_article'] = event['last_article']
+    
+    elapsed = event['time'] - scrape_status['started_at']
+    if elapsed > 0:
+        scrape_status['articles_per_minute'] = round(scrape_status['total_articles'] * 60 / elapsed, 1)
+        scrape_status['images_per_second'] = round(scrape_status['total_images'] / elapsed, 2)
+
+
+def run_scrape(category, max_pages, skip_existing, incremental=False, resume=False):
     """执行爬取任务"""
     global scrape_status
     
     def progress_callback(msg):
+        # 页码、计数等结构化进度由 on_scrape_event 更新
         scrape_status['progress'] = msg
-        if '第' in msg and '页' in msg:
-            try:
-                page = int(msg.split('第')[1].split('页')[0].strip())
-                scrape_status['current_page'] = page
-            except:
-                pass
+        publish_status()
     
+    scraper.add_listener(on_scrape_event)
     try:
         if category:
             # 爬取指定分类
@@ -186,7 +309,9 @@ def run_scrape(category, max_pages, skip_existing):
                 category,
                 max_pages=max_pages,
                 skip_existing=skip_existing,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                incremental=incremental,
+                resume=resume
             )
             scrape_status['total_articles'] = count
             scrape_status['progress'] = f'完成！共爬取 {count} 篇文章'
@@ -195,7 +320,9 @@ def run_scrape(category, max_pages, skip_existing):
             stats = scraper.scrape_all_categories(
                 max_pages_per_category=max_pages,
                 skip_existing=skip_existing,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                incremental=incremental,
+                resume=resume
             )
             total = sum(stats.values())
             scrape_status['total_articles'] = total
@@ -206,8 +333,11 @@ def run_scrape(category, max_pages, skip_existing):
         scrape_status['progress'] = f'错误: {str(e)}'
     
     finally:
+        scraper.remove_listener(on_scrape_event)
+        scraper.close()
         scrape_status['is_running'] = False
         scrape_status['should_stop'] = False
+        publish_status()
 
 
 @app.route('/api/categories')
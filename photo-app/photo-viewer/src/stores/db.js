@@ -39,6 +39,17 @@ export const useDbStore = defineStore('db', () => {
   // GitHub API 地址（用于获取文件信息）
   const githubApiUrl = 'https://api.github.com/repos/sky2048/photo-app/contents/photo-app/photo-viewer/public/photo.db'
   
+  // 增量更新清单（export.py delta 生成，位于 photo.db 同目录的 updates/ 下）
+  const manifestUrls = dbUrls.map(url => url.replace(/photo\.db$/, 'updates/manifest.json'))
+  
+  // 标签 JSON 数组展开成空格分隔的文本，与 sqlite_schema.py 的 tags_text_sql 一致
+  const tagsTextSql = "(SELECT group_concat(value, ' ') FROM json_each(CASE WHEN json_valid(tags) THEN tags END))"
+  
+  // 原生平台导入时从 articles 重建的虚拟表，语句与迁移中的回填一致
+  const virtualTableFills = {
+    articles_fts: `INSERT INTO articles_fts (rowid, title, description, tags) SELECT id, title, description, ${tagsTextSql} FROM articles`
+  }
+  
   
   // 检查是否有待应用的更新
   async function checkPendingUpdate() {
@@ -278,12 +289,24 @@ export const useDbStore = defineStore('db', () => {
       
       addLog('找到 ' + (tablesResult.values?.length || 0) + ' 个表')
       
+      // 全文索引等虚拟表不能逐表复制：虚拟表本身不能扫描，影子表（如 articles_fts_data）
+      // 在创建虚拟表时已经生成，再复制会冲突。跳过它们，数据复制完成后从 articles 重建
+      const virtualResult = await db.value.query(
+        "SELECT name, sql FROM downloaded.sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%'",
+        []
+      )
+      const virtualTables = (virtualResult.values || []).map(row => ({ name: row.name || row[0], sql: row.sql || row[1] }))
+      const isVirtualTable = name => virtualTables.some(table => name === table.name || name.startsWith(table.name + '_'))
+      
       if (tablesResult.values && tablesResult.values.length > 0) {
         // 提取所有表名
         const tableNames = tablesResult.values.map(row => row.name || row[0])
         addLog('表列表: ' + tableNames.join(', '))
         
         for (const tableName of tableNames) {
+          if (isVirtualTable(tableName)) {
+            continue
+          }
           addLog('处理表: ' + tableName)
           
           // 获取表结构（一次性获取）
@@ -318,7 +341,47 @@ export const useDbStore = defineStore('db', () => {
           }
         }
       }
+
+      // 重建虚拟表；不知道如何重建的不创建，查询时出错会退回普通查询，而不是返回空结果
+      for (const { name, sql } of virtualTables) {
+        const fill = virtualTableFills[name]
+        if (!fill) {
+          addLog('跳过虚拟表: ' + name)
+          continue
+        }
+        try {
+          await db.value.execute(sql)
+          await db.value.execute(fill)
+          addLog('✓ 重建: ' + name)
+        } catch (e) {
+          addLog('✗ 重建失败: ' + name + ', ' + e.message)
+          try {
+            await db.value.execute(`DROP TABLE IF EXISTS ${name};`)
+          } catch (dropError) {
+            addLog('✗ 删除失败: ' + name + ', ' + dropError.message)
+          }
+        }
+      }
       
+      // 数据复制完成后再创建索引、视图和触发器。触发器放在最后，复制数据时不触发；
+      // 增量更新只写 articles、image_files 等基础表，统计、标签、随机浏览和全文索引靠触发器同步
+      const schemaResult = await db.value.query(
+        "SELECT name, sql FROM downloaded.sqlite_master WHERE type IN ('index', 'view', 'trigger') AND sql IS NOT NULL ORDER BY type = 'trigger', type, name",
+        []
+      )
+      for (const row of schemaResult.values || []) {
+        const name = row.name || row[0]
+        const sql = row.sql || row[1]
+        try {
+          await db.value.execute(sql)
+          addLog('✓ 创建: ' + name)
+        } catch (e) {
+          if (!e.message.includes('already exists')) {
+            addLog('✗ 创建失败: ' + name + ', ' + e.message)
+          }
+        }
+      }
+
       // 关键：关闭数据库连接，这会自动分离所有附加的数据库
       addLog('关闭数据库连接...')
       await db.value.close()
@@ -579,11 +642,190 @@ export const useDbStore = defineStore('db', () => {
     }
   }
   
+  // 读取 updates/ 目录下的文件（清单或变更集），依次尝试各个 CDN
+  async function fetchUpdateFile(name) {
+    let lastError = null
+    for (const manifestUrl of manifestUrls) {
+      try {
+        const response = await fetch(manifestUrl.replace(/manifest\.json$/, name), { cache: 'no-cache' })
+        if (!response.ok) {
+          throw new Error(`HTTP ${response.status}`)
+        }
+        return await response.json()
+      } catch (error) {
+        lastError = error
+      }
+    }
+    throw new Error(`获取 ${name} 失败: ${lastError?.message}`)
+  }
+  
+  // 执行查询并返回对象数组（两个平台通用）
+  async function queryRows(sql, params = []) {
+    if (isWebPlatform.value) {
+      const result = sqlJsDb.value.exec(sql, params)
+      if (result.length === 0) return []
+      const { columns, values } = result[0]
+      return values.map(row => Object.fromEntries(columns.map((column, i) => [column, row[i]])))
+    }
+    const result = await db.value.query(sql, params)
+    return result.values || []
+  }
+  
+  // 本地数据库的数据版本，只有 export.py delta 发布的数据库才有
+  async function getLocalDataVersion() {
+    try {
+      const rows = await queryRows("SELECT key, value FROM export_info WHERE key IN ('data_version', 'schema_version')")
+      const info = Object.fromEntries(rows.map(row => [row.key, parseInt(row.value, 10)]))
+      if (!info.data_version) return null
+      // 原生平台以前导入时没有复制触发器，派生表不会随变更集同步，这样的数据库只能下载完整数据库
+      const derived = await queryRows(
+        "SELECT (SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('articles_fts', 'tags', 'random_index', 'stats')) AS tables, " +
+        "(SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger') AS triggers"
+      )
+      if (derived[0]?.tables && !derived[0]?.triggers) return null
+      return { dataVersion: info.data_version, schemaVersion: info.schema_version }
+    } catch (error) {
+      // 旧数据库没有 export_info 表
+      return null
+    }
+  }
+  
+  // 从本地版本到最新版本需要依次应用的变更集，不能连续增量更新时返回 null
+  function planChangesets(manifest, local) {
+    if (!local || manifest.format !== 1) return null
+    
+    const plan = []
+    let current = local.dataVersion
+    for (const entry of manifest.changesets) {
+      if (entry.version <= current) continue
+      if (entry.from !== current || entry.schema_version !== local.schemaVersion) return null
+      plan.push(entry)
+      current = entry.version
+    }
+    return current === manifest.latest ? plan : null
+  }
+  
+  // 把变更集转换成 SQL 语句，与 export.py 的 apply_changeset 一致
+  function changesetStatements(changeset) {
+    const statements = []
+    
+    const columns = changeset.columns
+    const assignments = columns
+      .filter(column => column !== 'id')
+      .map(column => `${column} = excluded.${column}`)
+      .join(', ')
+    const upsert = `INSERT INTO articles (${columns.join(', ')}) VALUES (${columns.map(() => '?').join(', ')}) ` +
+      `ON CONFLICT(id) DO UPDATE SET ${assignments}`
+    for (const row of changeset.articles) {
+      statements.push({ statement: upsert, values: row })
+    }
+    
+    // 图片地址按最后一个 / 拆成前缀和文件名
+    for (const [key, urls] of Object.entries(changeset.images)) {
+      const articleId = Number(key)
+      statements.push({ statement: 'DELETE FROM image_files WHERE article_id = ?', values: [articleId] })
+      urls.forEach((url, order) => {
+        const split = url.lastIndexOf('/') + 1
+        const prefix = url.slice(0, split)
+        statements.push({ statement: 'INSERT OR IGNORE INTO url_prefixes (prefix) VALUES (?)', values: [prefix] })
+        statements.push({
+          statement: 'INSERT INTO image_files (article_id, prefix_id, suffix, img_order) SELECT ?, id, ?, ? FROM url_prefixes WHERE prefix = ?',
+          values: [articleId, url.slice(split), order, prefix]
+        })
+      })
+    }
+    
+    for (const articleId of changeset.deleted) {
+      statements.push({ statement: 'DELETE FROM image_files WHERE article_id = ?', values: [articleId] })
+      statements.push({ statement: 'DELETE FROM articles WHERE id = ?', values: [articleId] })
+    }
+    
+    statements.push({
+      statement: "UPDATE export_info SET value = ? WHERE key = 'data_version'",
+      values: [String(changeset.version)]
+    })
+    return statements
+  }
+  
+  // 在一个事务中应用变更集
+  async function applyChangeset(changeset) {
+    const statements = changesetStatements(changeset)
+    
+    if (isWebPlatform.value) {
+      sqlJsDb.value.exec('BEGIN')
+      try {
+        for (const { statement, values } of statements) {
+          sqlJsDb.value.run(statement, values)
+        }
+        sqlJsDb.value.exec('COMMIT')
+      } catch (error) {
+        sqlJsDb.value.exec('ROLLBACK')
+        throw error
+      }
+    } else {
+      await db.value.executeSet(statements, true)
+    }
+  }
+  
+  // 增量更新：下载并依次应用变更集，不能增量更新时返回 false
+  async function updateDatabaseIncremental() {
+    try {
+      const manifest = await fetchUpdateFile('manifest.json')
+      const local = await getLocalDataVersion()
+      const plan = planChangesets(manifest, local)
+      if (!plan) {
+        addLog('无法增量更新，需要下载完整数据库')
+        return false
+      }
+      
+      addLog(`增量更新: 版本 ${local.dataVersion} → ${manifest.latest}，共 ${plan.length} 个变更集`)
+      for (const entry of plan) {
+        const changeset = await fetchUpdateFile(entry.file)
+        await applyChangeset(changeset)
+        addLog(`✓ 已应用变更集 ${entry.version}（${entry.articles} 篇文章）`)
+      }
+      
+      if (isWebPlatform.value) {
+        localStorage.setItem('photo_db', uint8ArrayToBase64(sqlJsDb.value.export()))
+      }
+      const countRows = await queryRows('SELECT COUNT(*) as total FROM articles')
+      articleCount.value = countRows[0]?.total || 0
+      return true
+    } catch (error) {
+      // 每个变更集单独提交，失败后已应用的部分保留，下次从中断处继续
+      addLog('增量更新失败: ' + error.message)
+      return false
+    }
+  }
+  
   // 检查是否需要更新数据库
   async function checkDatabaseUpdate() {
     try {
       addLog('=== 检查数据库更新 ===')
       
+      // 优先使用增量更新清单，本地数据库没有数据版本时按文件版本比较
+      try {
+        const manifest = await fetchUpdateFile('manifest.json')
+        const local = await getLocalDataVersion()
+        if (local) {
+          const hasUpdate = manifest.latest > local.dataVersion
+          const plan = planChangesets(manifest, local)
+          const reason = !hasUpdate ? '已是最新'
+            : plan ? `增量更新 ${plan.length} 个版本，约 ${Math.ceil(plan.reduce((sum, entry) => sum + entry.size, 0) / 1024)} KB`
+            : '需要下载完整数据库'
+          addLog(`更新检查结果: 数据版本 ${local.dataVersion} → ${manifest.latest} (${reason})`)
+          return {
+            hasUpdate,
+            remoteVersion: { dataVersion: manifest.latest },
+            localVersion: local,
+            reason,
+            incremental: !!plan
+          }
+        }
+      } catch (error) {
+        addLog('读取增量更新清单失败: ' + error.message)
+      }
+      
       // 获取远程版本
       const remoteVersion = await checkRemoteDatabaseVersion()
       
@@ -634,6 +876,12 @@ export const useDbStore = defineStore('db', () => {
     try {
       addLog('=== 开始更新数据库 ===')
       
+      // 先尝试增量更新，不需要重新下载整个数据库
+      if (await updateDatabaseIncremental()) {
+        addLog('增量更新成功')
+        return { success: true, needRestart: false, incremental: true }
+      }
+      
       if (isWebPlatform.value) {
         // Web 平台：直接更新
         addLog('Web 平台，直接更新')
@@ -865,80 +1113,184 @@ export const useDbStore = defineStore('db', () => {
     }
   }
   
+  // 搜索范围：标题、简介和标签（标签是 JSON 数组，展开成文本后匹配）
+  const searchPredicate = `(title LIKE ? OR description LIKE ? OR ${tagsTextSql} LIKE ?)`
+  
+  // 全文索引的 MATCH 表达式：trigram 索引按 3 个字检索，关键词拆成相邻的三字组
+  // 少于 3 个字时无法使用索引，返回 null
+  function ftsMatchQuery(keyword) {
+    const chars = Array.from(keyword)
+    if (chars.length < 3) return null
+    
+    const trigrams = new Set()
+    for (let i = 0; i + 3 <= chars.length; i++) {
+      trigrams.add('"' + chars.slice(i, i + 3).join('').replace(/"/g, '""') + '"')
+    }
+    return Array.from(trigrams).join(' AND ')
+  }
+  
+  // 搜索语句：有全文索引时先用索引找出候选文章，再用 LIKE 确认（索引不记录位置，三字组可能不相邻）
+  function searchQuery(keyword, useFts) {
+    const pattern = `%${keyword}%`
+    const match = useFts ? ftsMatchQuery(keyword) : null
+    if (match) {
+      return {
+        sql: `SELECT * FROM articles
+          WHERE id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?) AND ${searchPredicate}
+          ORDER BY id DESC LIMIT 50`,
+        params: [match, pattern, pattern, pattern]
+      }
+    }
+    return {
+      sql: `SELECT * FROM articles WHERE ${searchPredicate} ORDER BY id DESC LIMIT 50`,
+      params: [pattern, pattern, pattern]
+    }
+  }
+  
   // 搜索文章
   async function searchArticles(keyword) {
+    keyword = keyword.trim()
+    
     if (isWebPlatform.value) {
       if (!sqlJsDb.value) return []
       
-      try {
-        const stmt = sqlJsDb.value.prepare(
-          'SELECT * FROM articles WHERE title LIKE ? ORDER BY id DESC LIMIT 50'
-        )
-        stmt.bind([`%${keyword}%`])
+      const run = ({ sql, params }) => {
+        const stmt = sqlJsDb.value.prepare(sql)
+        stmt.bind(params)
         
         const articles = []
         while (stmt.step()) {
           articles.push(stmt.getAsObject())
         }
         stmt.free()
-        
         return articles
+      }
+      
+      try {
+        return run(searchQuery(keyword, true))
       } catch (error) {
-        console.error('搜索失败:', error)
-        return []
+        // 旧数据库没有全文索引
+        try {
+          return run(searchQuery(keyword, false))
+        } catch (fallbackError) {
+          console.error('搜索失败:', fallbackError)
+          return []
+        }
       }
     } else {
       if (!db.value) return []
       
-      try {
-        const result = await db.value.query(
-          'SELECT * FROM articles WHERE title LIKE ? ORDER BY id DESC LIMIT 50',
-          [`%${keyword}%`]
-        )
-        
+      const run = async ({ sql, params }) => {
+        const result = await db.value.query(sql, params)
         return result.values || []
-      } catch (error) {
-        console.error('搜索失败:', error)
-        return []
       }
-    }
-  }
-  
-  // 获取随机文章
-  async function getRandomArticle() {
-    if (isWebPlatform.value) {
-      if (!sqlJsDb.value) return null
       
       try {
-        const stmt = sqlJsDb.value.prepare(
-          'SELECT * FROM articles ORDER BY RANDOM() LIMIT 1'
-        )
-        
-        if (stmt.step()) {
-          const article = stmt.getAsObject()
-          stmt.free()
-          return article
-        }
-        
-        stmt.free()
-        return null
+        return await run(searchQuery(keyword, true))
       } catch (error) {
-        console.error('获取随机文章失败:', error)
-        return null
+        // 旧数据库没有全文索引
+        try {
+          return await run(searchQuery(keyword, false))
+        } catch (fallbackError) {
+          console.error('搜索失败:', fallbackError)
+          return []
+        }
       }
-    } else {
-      if (!db.value) return null
+    }
+  }
+  
+  // 获取热门标签（按文章数倒序）
+  async function getTags(limit = 50) {
+    if (isWebPlatform.value ? !sqlJsDb.value : !db.value) return []
+    
+    try {
+      return await queryRows(
+        'SELECT name, article_count FROM tags WHERE article_count > 0 ORDER BY article_count DESC LIMIT ?',
+        [limit]
+      )
+    } catch (error) {
+      // 旧数据库没有标签表
+      console.error('获取标签失败:', error)
+      return []
+    }
+  }
+  
+  // 获取标签下的文章列表
+  async function getArticlesByTag(tag, limit = 20, offset = 0) {
+    if (isWebPlatform.value ? !sqlJsDb.value : !db.value) return []
+    
+    try {
+      return await queryRows(`
+        SELECT a.* FROM article_tags at JOIN articles a ON a.id = at.article_id
+        WHERE at.tag_id = (SELECT id FROM tags WHERE name = ?)
+        ORDER BY at.article_id DESC LIMIT ? OFFSET ?
+      `, [tag, limit, offset])
+    } catch (error) {
+      console.error('获取标签文章失败:', error)
+      return []
+    }
+  }
+  
+  // 获取相关文章：按共同标签打分，越少见的标签权重越高
+  async function getRelatedArticles(articleId, limit = 10) {
+    if (isWebPlatform.value ? !sqlJsDb.value : !db.value) return []
+    
+    try {
+      return await queryRows(`
+        SELECT a.* FROM (
+          SELECT other.article_id AS id, SUM(1.0 / t.article_count) AS score
+          FROM article_tags mine
+          JOIN tags t ON t.id = mine.tag_id
+          JOIN article_tags other ON other.tag_id = mine.tag_id AND other.article_id <> mine.article_id
+          WHERE mine.article_id = ?
+          GROUP BY other.article_id
+          ORDER BY score DESC, other.article_id DESC
+          LIMIT ?
+        ) r JOIN articles a ON a.id = r.id
+        ORDER BY r.score DESC, a.id DESC
+      `, [articleId, limit])
+    } catch (error) {
+      console.error('获取相关文章失败:', error)
+      return []
+    }
+  }
+  
+  // 获取随机文章（可限定分类）：在随机索引中取一个随机序号，是一次索引查找
+  async function getRandomArticle(category = '') {
+    if (isWebPlatform.value ? !sqlJsDb.value : !db.value) return null
+    
+    try {
+      const countRows = category
+        ? await queryRows('SELECT MAX(category_seq) + 1 AS total FROM random_index WHERE category = ?', [category])
+        : await queryRows('SELECT MAX(seq) + 1 AS total FROM random_index')
+      const total = countRows[0]?.total || 0
       
-      try {
-        const result = await db.value.query(
-          'SELECT * FROM articles ORDER BY RANDOM() LIMIT 1'
-        )
-        
-        return result.values?.[0] || null
-      } catch (error) {
-        console.error('获取随机文章失败:', error)
-        return null
+      if (total > 0) {
+        const seq = Math.floor(Math.random() * total)
+        const rows = category
+          ? await queryRows(
+            'SELECT a.* FROM random_index r JOIN articles a ON a.id = r.article_id WHERE r.category = ? AND r.category_seq = ?',
+            [category, seq]
+          )
+          : await queryRows(
+            'SELECT a.* FROM random_index r JOIN articles a ON a.id = r.article_id WHERE r.seq = ?',
+            [seq]
+          )
+        if (rows.length > 0) return rows[0]
       }
+    } catch (error) {
+      // 旧数据库没有随机索引
+      console.log('随机索引不可用，使用 ORDER BY RANDOM():', error.message)
+    }
+    
+    try {
+      const rows = category
+        ? await queryRows('SELECT * FROM articles WHERE category = ? ORDER BY RANDOM() LIMIT 1', [category])
+        : await queryRows('SELECT * FROM articles ORDER BY RANDOM() LIMIT 1')
+      return rows[0] || null
+    } catch (error) {
+      console.error('获取随机文章失败:', error)
+      return null
     }
   }
   
@@ -989,6 +1341,9 @@ export const useDbStore = defineStore('db', () => {
     getArticles,
     getArticleDetail,
     searchArticles,
+    getTags,
+    getArticlesByTag,
+    getRelatedArticles,
     getRandomArticle
   }
 })
@@ -1,7 +1,13 @@
 """数据库检查工具"""
 import sqlite3
+import os
 import sys
 
+# 派生表的检查定义在爬虫中（photo-scraper/plugins/sqlite_schema.py）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'photo-scraper'))
+
+from plugins.sqlite_schema import check_derived_tables
+
 
 def check_database(db_path='photo.db'):
     """检查数据库内容"""
@@ -50,9 +56,18 @@ def check_database(db_path='photo.db'):
                 for log in logs:
                     print(f"  日期: {log[0]}, 分类: {log[1]}, 数量: {log[2]}")
         
+        # 检查触发器维护的统计、标签、随机浏览和全文索引
+        problems = check_derived_tables(conn)
+        if problems:
+            print(f"\n派生表不一致:")
+            for problem in problems:
+                print(f"  {problem}")
+        else:
+            print(f"\n派生表: 一致")
+        
         conn.close()
         print("\n" + "=" * 60)
-        
+    
     except Exception as e:
         print(f"错误: {e}")
         sys.exit(1)
@@ -3,6 +3,11 @@ import sqlite3
 import os
 import sys
 
+# 表结构定义在爬虫中（photo-scraper/plugins/sqlite_schema.py）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'photo-scraper'))
+
+from plugins.sqlite_schema import migrate, SCHEMA_VERSION
+
 
 def clear_database(db_path='photo.db', confirm=True):
     """清空数据库"""
@@ -21,49 +26,12 @@ def clear_database(db_path='photo.db', confirm=True):
         os.remove(db_path)
         print(f"✓ 已删除 {db_path}")
         
-        # 重新创建空数据库
+        # 重新创建空数据库，表结构与爬虫共用同一套迁移
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # 创建表结构
-        cursor.execute('''
-            CREATE TABLE articles (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                category TEXT,
-                thumbnail TEXT,
-                description TEXT,
-                detail_url TEXT,
-                date TEXT,
-                tags TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER,
-                image_url TEXT NOT NULL,
-                img_order INTEGER,
-                FOREIGN KEY (article_id) REFERENCES articles (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE scrape_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                scrape_date DATE,
-                category TEXT,
-                articles_count INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
+        migrate(conn)
         conn.close()
         
-        print("✓ 数据库已重新初始化")
+        print(f"✓ 数据库已重新初始化（结构版本 {SCHEMA_VERSION}）")
         
         # 验证
         conn = sqlite3.connect(db_path)
@@ -73,7 +41,7 @@ def clear_database(db_path='photo.db', confirm=True):
         cursor.execute('SELECT COUNT(*) FROM images')
         print(f"✓ 图片数量: {cursor.fetchone()[0]}")
         conn.close()
-        
+    
     except Exception as e:
         print(f"错误: {e}")
         sys.exit(1)